@@ -0,0 +1,207 @@
+"""
+Differential check and micro-benchmark for the "all" prediction set review
+functions accept_all_by_confidence and split_merged_values
+
+Runs the single pass implementations in auto_review_functions.py and the
+original ones kept below on the same randomized predictions, checks that the
+returned predictions and the changes made in place are identical, then times
+both on long documents.
+
+USAGE: python3 benchmark_all_set_reviewers.py [n_cases] [n_predictions]
+"""
+import sys
+import copy
+import random
+from timeit import default_timer as timer
+
+from solutions_toolkit.auto_review.auto_review_functions import (
+    ACCEPTED,
+    REJECTED,
+    accept_all_by_confidence,
+    split_merged_values,
+)
+
+LABEL = "Deposit Amount"
+OTHER_LABEL = "Deposit Date"
+TOKENS = ["1,000.00", "250.10", "12/31/2020", "Acme", "LLC", "", "x"]
+SEPARATORS = [" ", "  ", ",", ", ", "\t", "\n"]
+CONFIDENCES = [0.1, 0.5, 0.97, 0.98, 0.981, 0.99, 1.0]
+
+
+def reference_accept_all_by_confidence(predictions, label="asdf", conf_threshold=0.98):
+    """
+    The original three pass implementation, kept as the reference
+    """
+    pred_values = set()
+
+    for pred in predictions:
+        if pred.get(REJECTED) is None:
+            if pred["confidence"][label] > conf_threshold:
+                pred_values.add(pred["text"])
+
+    if len(pred_values) == 1:
+        text = pred_values.pop()
+        for pred in predictions:
+            if pred["text"] == text:
+                if not pred["confidence"][label] > conf_threshold:
+                    return predictions
+
+        for pred in predictions:
+            if pred["text"] == text:
+                pred[ACCEPTED] = True
+    return predictions
+
+
+def reference_split_merged_values(predictions, split_filter=None):
+    """
+    The original implementation, kept as the reference
+    """
+    updated_predictions = []
+    for pred in predictions:
+        merged_text = pred["text"]
+        start = pred["start"]
+        if split_filter:
+            split_text = merged_text.split(split_filter)
+        else:
+            split_text = merged_text.split()
+        if len(split_text) == 1 or pred.get("rejected"):
+            updated_predictions.append(pred)
+            continue
+
+        current_start = start
+        for text in split_text:
+            str_len = len(text)
+            if str_len == 0:
+                current_start += 1
+                continue
+
+            split_value_start = current_start
+            split_value_end = split_value_start + str_len
+            current_start = split_value_end + 1
+            split_val_pred_dict = {
+                "text": text,
+                "start": split_value_start,
+                "end": split_value_end,
+                "label": pred["label"],
+                "confidence": pred["confidence"],
+            }
+            updated_predictions.append(split_val_pred_dict)
+    return updated_predictions
+
+
+def random_predictions(rng, n_predictions, n_texts):
+    """
+    Predictions drawn from a few texts so accept_all_by_confidence often
+    finds a single confident text, with merged values and edge cases like
+    empty, padded and repeated separators for split_merged_values
+    """
+    texts = []
+    for _ in range(n_texts):
+        separator = rng.choice(SEPARATORS)
+        text = separator.join(rng.choice(TOKENS) for _ in range(rng.randint(1, 4)))
+        if rng.random() < 0.1:
+            text = separator + text + separator
+        texts.append(text)
+
+    predictions = []
+    offset = 0
+    for _ in range(n_predictions):
+        text = rng.choice(texts)
+        pred = {
+            "label": LABEL,
+            "text": text,
+            "start": offset,
+            "end": offset + len(text),
+            "confidence": {LABEL: rng.choice(CONFIDENCES), OTHER_LABEL: rng.random()},
+        }
+        roll = rng.random()
+        if roll < 0.1:
+            pred[REJECTED] = True
+        elif roll < 0.15:
+            pred[REJECTED] = False
+        elif roll < 0.2:
+            pred[REJECTED] = None
+        elif roll < 0.25:
+            pred[ACCEPTED] = True
+        predictions.append(pred)
+        offset += len(text) + rng.randint(1, 5)
+    return predictions
+
+
+def check_case(fn, reference_fn, predictions, kwargs):
+    """
+    Return whether fn and reference_fn return the same predictions, change
+    the input the same way and share confidence dicts the same way
+    """
+    inputs = copy.deepcopy(predictions)
+    reference_inputs = copy.deepcopy(predictions)
+    output = fn(inputs, **kwargs)
+    reference_output = reference_fn(reference_inputs, **kwargs)
+    if output != reference_output or inputs != reference_inputs:
+        return False
+
+    def sharing(output, inputs):
+        confidences = {id(pred["confidence"]): i for i, pred in enumerate(inputs)}
+        return [confidences.get(id(pred["confidence"])) for pred in output]
+
+    return sharing(output, inputs) == sharing(reference_output, reference_inputs)
+
+
+def differential_check(n_cases, seed=0):
+    rng = random.Random(seed)
+    failures = 0
+    for case in range(n_cases):
+        predictions = random_predictions(rng, rng.randint(0, 30), rng.randint(1, 4))
+        checks = [
+            (
+                accept_all_by_confidence,
+                reference_accept_all_by_confidence,
+                {"label": LABEL, "conf_threshold": rng.choice(CONFIDENCES)},
+            ),
+            (
+                split_merged_values,
+                reference_split_merged_values,
+                {"split_filter": rng.choice([None, "", ",", " ", ", "])},
+            ),
+        ]
+        for fn, reference_fn, kwargs in checks:
+            if not check_case(fn, reference_fn, predictions, kwargs):
+                failures += 1
+                print(f"MISMATCH: {fn.__name__} case {case} with {kwargs}")
+    return failures
+
+
+def time_fn(fn, documents, kwargs):
+    documents = copy.deepcopy(documents)
+    start = timer()
+    for predictions in documents:
+        fn(predictions, **kwargs)
+    return timer() - start
+
+
+if __name__ == "__main__":
+    n_cases = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    n_predictions = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    failures = differential_check(n_cases)
+    print(f"{n_cases} random cases, {failures} mismatches")
+    if failures:
+        sys.exit(1)
+
+    rng = random.Random(1)
+    # one text takes accept_all_by_confidence through every pass, several
+    # let the single pass version stop at the second confident text
+    for n_texts in (1, 3):
+        documents = [random_predictions(rng, n_predictions, n_texts) for _ in range(20)]
+        for fn, reference_fn, kwargs in (
+            (accept_all_by_confidence, reference_accept_all_by_confidence, {"label": LABEL}),
+            (split_merged_values, reference_split_merged_values, {}),
+        ):
+            reference_time = time_fn(reference_fn, documents, kwargs)
+            fn_time = time_fn(fn, documents, kwargs)
+            print(
+                f"{fn.__name__:<26} {n_texts} text(s)"
+                f"  original {reference_time / len(documents) * 1000:.2f} ms/doc"
+                f"  single pass {fn_time / len(documents) * 1000:.2f} ms/doc"
+                f"  speedup {reference_time / fn_time:.1f}x"
+            )
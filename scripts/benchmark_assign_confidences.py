@@ -0,0 +1,100 @@
+"""
+Micro-benchmark for assign_confidences in generate_export.py
+
+Compares the dictionary join against the original nested loop on synthetic
+documents and checks that both assign the same confidences.
+
+USAGE: python3 benchmark_assign_confidences.py [n_spans] [n_docs]
+"""
+import sys
+import copy
+import random
+from timeit import default_timer as timer
+
+from generate_export import assign_confidences
+
+MODEL_NAME = "benchmark model"
+LABELS = ["Deposit Date", "Deposit Amount", "Check Number", "Check Amount"]
+
+
+def nested_loop_assign_confidences(results, model_name):
+    """
+    The original quadratic implementation, kept as the reference
+    """
+    preds_pre_review = results["results"]["document"]["results"][model_name][
+        "pre_review"
+    ]
+    preds_final = results["results"]["document"]["results"][model_name]["final"]
+
+    for pred_final in preds_final:
+        for pred_pre_review in preds_pre_review:
+            if (
+                pred_pre_review["start"] == pred_final["start"]
+                and pred_pre_review["end"] == pred_final["end"]
+                and pred_pre_review["label"] == pred_final["label"]
+            ):
+                pred_final["confidence"] = pred_pre_review["confidence"]
+    return preds_final
+
+
+def synthetic_results(n_spans, seed):
+    """
+    Build a results payload with n_spans pre review predictions, where review
+    kept most spans, relabeled or moved some and added a few new ones
+    """
+    rng = random.Random(seed)
+    pre_review = []
+    offset = 0
+    for _ in range(n_spans):
+        start = offset + rng.randint(0, 5)
+        end = start + rng.randint(1, 12)
+        offset = end
+        label = rng.choice(LABELS)
+        confidence = {l: rng.random() for l in LABELS}
+        pre_review.append(
+            {"start": start, "end": end, "label": label, "text": "x", "confidence": confidence}
+        )
+    # duplicate spans exercise the last match wins rule
+    pre_review.extend(copy.deepcopy(rng.sample(pre_review, n_spans // 100)))
+
+    final = []
+    for pred in pre_review[:n_spans]:
+        roll = rng.random()
+        if roll < 0.8:
+            final.append({k: v for k, v in pred.items() if k != "confidence"})
+        elif roll < 0.9:
+            final.append(dict(pred, label=rng.choice(LABELS), confidence=None))
+        else:
+            final.append({"start": pred["start"] + 1, "end": pred["end"], "label": pred["label"], "text": "y"})
+    return {
+        "results": {
+            "document": {
+                "results": {MODEL_NAME: {"pre_review": pre_review, "final": final}}
+            }
+        }
+    }
+
+
+def time_fn(fn, docs):
+    docs = copy.deepcopy(docs)
+    start = timer()
+    outputs = [fn(doc, MODEL_NAME) for doc in docs]
+    return timer() - start, outputs
+
+
+if __name__ == "__main__":
+    n_spans = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    n_docs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    docs = [synthetic_results(n_spans, seed) for seed in range(n_docs)]
+    nested_time, nested_outputs = time_fn(nested_loop_assign_confidences, docs)
+    joined_time, joined_outputs = time_fn(assign_confidences, docs)
+
+    if nested_outputs != joined_outputs:
+        print("MISMATCH: assign_confidences output differs from the nested loop")
+        sys.exit(1)
+
+    print(f"{n_docs} documents with {n_spans} spans")
+    print(f"nested loop: {nested_time / n_docs * 1000:.1f} ms/doc")
+    print(f"dict join:   {joined_time / n_docs * 1000:.1f} ms/doc")
+    print(f"speedup:     {nested_time / joined_time:.0f}x")
@@ -0,0 +1,173 @@
+"""
+Benchmark for the review plans of the field configs in configurations/
+
+Replays every *field_config.yaml on seeded synthetic documents and reports,
+per config, the throughput of Reviewer with the memory it allocates, and per
+review function the time and peak memory of its steps. The same arguments
+always generate the same documents, so results can be compared across
+commits; pass an output path to also write them as json.
+
+USAGE: python3 benchmark_review_rules.py [predictions_per_doc] [n_docs] [output.json]
+"""
+import os
+import sys
+import copy
+import glob
+import json
+import tracemalloc
+from collections import defaultdict
+from timeit import default_timer as timer
+
+from solutions_toolkit.auto_review import Reviewer, FieldConfiguration
+from solutions_toolkit.auto_review.synthetic import synthetic_documents
+
+MODEL_NAME = "benchmark model"
+CONFIG_GLOB = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "configurations", "*field_config.yaml"
+)
+SEED = 0
+# timings are the best of this many runs
+REPEAT = 3
+
+
+def review_each(review_plan, documents):
+    updated = []
+    for document in documents:
+        reviewer = Reviewer(document, MODEL_NAME, review_plan)
+        reviewer.apply_reviews()
+        updated.append(reviewer.get_updated_predictions())
+    return updated
+
+
+def timed(fn, review_plan, documents):
+    best = None
+    for _ in range(REPEAT):
+        # the review functions change predictions in place, every run gets a copy
+        run_documents = copy.deepcopy(documents)
+        start = timer()
+        fn(review_plan, run_documents)
+        seconds = timer() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def allocations(fn, review_plan, documents):
+    """
+    Return the memory blocks allocated and still held after fn, and the peak
+    traced memory in bytes while it ran
+    """
+    documents = copy.deepcopy(documents)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = fn(review_plan, documents)
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    return blocks, peak
+
+
+def rule_stats(review_plan, documents, stats, trace_memory=False):
+    """
+    Run the plan step by step as Reviewer does, adding the seconds, calls and
+    predictions reviewed of every review function to stats, or with
+    trace_memory only its peak bytes, as tracing slows the steps down
+    """
+    documents = copy.deepcopy(documents)
+    if trace_memory:
+        tracemalloc.start()
+    for document in documents:
+        reviewer = Reviewer(document, MODEL_NAME, review_plan)
+        for label, steps in review_plan:
+            for step in steps:
+                predictions = reviewer.prediction_label_map[label]
+                rule = stats[step.function_name]
+                if trace_memory:
+                    tracemalloc.reset_peak()
+                    current, _ = tracemalloc.get_traced_memory()
+                    reviewer.prediction_label_map[label] = step.apply(predictions)
+                    _, peak = tracemalloc.get_traced_memory()
+                    rule["peak_bytes"] = max(rule["peak_bytes"], peak - current)
+                    continue
+                n_predictions = len(predictions)
+                start = timer()
+                reviewer.prediction_label_map[label] = step.apply(predictions)
+                rule["seconds"] += timer() - start
+                rule["calls"] += 1
+                rule["predictions"] += n_predictions
+    if trace_memory:
+        tracemalloc.stop()
+
+
+def benchmark_config(path, predictions_per_doc, n_docs, rules):
+    field_config = FieldConfiguration.from_yaml(path)
+    documents = synthetic_documents(
+        field_config.field_config, n_docs, predictions_per_doc, MODEL_NAME, SEED
+    )
+    n_predictions = sum(len(document[MODEL_NAME]) for document in documents)
+    review_plan = field_config.review_plan
+
+    result = {
+        "classes": len(field_config.field_config),
+        "steps": sum(len(steps) for _, steps in review_plan),
+        "documents": n_docs,
+        "predictions": n_predictions,
+    }
+    seconds = timed(review_each, review_plan, documents)
+    blocks, peak = allocations(review_each, review_plan, documents)
+    result.update(
+        {
+            "seconds": round(seconds, 4),
+            "docs_per_second": round(n_docs / seconds, 1),
+            "predictions_per_second": round(n_predictions / seconds),
+            "allocated_blocks": blocks,
+            "peak_kb": round(peak / 1024, 1),
+        }
+    )
+    rule_stats(review_plan, documents, rules)
+    rule_stats(review_plan, documents, rules, trace_memory=True)
+    return result
+
+
+def print_results(results, rules):
+    print(
+        f"{'config':<36}{'preds':>8}{'steps':>7}"
+        f"{'docs/s':>10}{'preds/s':>10}{'blocks':>10}{'peak KB':>10}"
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<36}{result['predictions']:>8}{result['steps']:>7}"
+            f"{result['docs_per_second']:>10}{result['predictions_per_second']:>10}"
+            f"{result['allocated_blocks']:>10}{result['peak_kb']:>10}"
+        )
+    print()
+    print(f"{'rule':<34}{'calls':>8}{'predictions':>13}{'preds/s':>12}{'us/call':>10}{'peak KB':>10}")
+    for name, rule in sorted(rules.items(), key=lambda item: -item[1]["seconds"]):
+        print(
+            f"{name:<34}{rule['calls']:>8}{rule['predictions']:>13}"
+            f"{rule['predictions'] / rule['seconds']:>12.0f}"
+            f"{rule['seconds'] / rule['calls'] * 1e6:>10.1f}"
+            f"{rule['peak_bytes'] / 1024:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    predictions_per_doc = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    n_docs = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    output_path = sys.argv[3] if len(sys.argv) > 3 else None
+
+    rules = defaultdict(
+        lambda: {"seconds": 0.0, "calls": 0, "predictions": 0, "peak_bytes": 0}
+    )
+    results = {}
+    for path in sorted(glob.glob(CONFIG_GLOB)):
+        results[os.path.basename(path)] = benchmark_config(
+            path, predictions_per_doc, n_docs, rules
+        )
+
+    print(f"{n_docs} documents per config, about {predictions_per_doc} predictions each, seed {SEED}")
+    print_results(results, rules)
+    if output_path:
+        with open(output_path, "w") as f:
+            json.dump({"configs": results, "rules": rules}, f, indent=2)
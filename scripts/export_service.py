@@ -0,0 +1,177 @@
+"""
+Long running version of generate_export.py
+
+Keeps the configuration, field configuration and IndicoWrapper loaded and
+checks for new COMPLETE and PENDING_ADMIN_REVIEW submissions every
+EXPORT_POLL_INTERVAL seconds. New submissions are appended to the export and
+exception files as soon as they are found, so rows show up seconds after a
+review is finished instead of on the next scheduled run.
+
+An export can also be triggered on demand, e.g. by UiPath right before it
+reads the export file, through a local socket on EXPORT_SERVICE_PORT:
+
+    python3 export_service.py path/to/config.yaml            start the service
+    python3 export_service.py path/to/config.yaml export     export new submissions now
+    python3 export_service.py path/to/config.yaml status     print service status
+"""
+
+import os
+import sys
+import json
+import socket
+import logging
+import datetime
+import threading
+import socketserver
+
+from generate_export import run_export, create_indico_wrapper, load_review_plan
+from solutions_toolkit.uipath_block_scripts.config import ExportConfiguration
+from solutions_toolkit.indico_wrapper import SubmissionCursor
+
+
+USAGE_STRING = "USAGE: python3 export_service.py path/to/config.yaml [export|status]"
+COMPLETE_STATUS = "COMPLETE"
+EXCEPTION_STATUS = "PENDING_ADMIN_REVIEW"
+COMMANDS = ("export", "status")
+
+
+class ExportService:
+    def __init__(self, config):
+        self.config = config
+        self.indico_wrapper = create_indico_wrapper(config)
+        self.review_plan = load_review_plan(config)
+        # only submissions updated since they were last exported are listed,
+        # this also keeps DEBUG runs from exporting unretrieved ones again
+        self.cursor = SubmissionCursor(config.submission_cursor_file)
+        self.started = datetime.datetime.now()
+        self.last_export = None
+        self.exports = 0
+        self.totals = {"submissions": 0, "rows": 0, "exceptions": 0}
+        self._lock = threading.Lock()
+
+    def export_new(self):
+        """
+        Export the submissions not seen before and return the counts
+        """
+        with self._lock:
+            complete_submissions = self._new_submissions(COMPLETE_STATUS)
+            exception_submissions = self._new_submissions(EXCEPTION_STATUS)
+            summary = {"submissions": 0, "rows": 0, "exceptions": 0}
+            if complete_submissions or exception_submissions:
+                try:
+                    summary = run_export(
+                        self.config,
+                        self.indico_wrapper,
+                        self.review_plan,
+                        append=True,
+                        complete_submissions=complete_submissions,
+                        exception_submissions=exception_submissions,
+                        # advanced only past the submissions the export handled
+                        cursor=self.cursor,
+                    )
+                except Exception:
+                    # the export saves the cursor once it finishes, go back
+                    # to the saved one so the next export lists them again
+                    self.cursor = SubmissionCursor(self.config.submission_cursor_file)
+                    raise
+                self.exports += 1
+                for key, count in summary.items():
+                    self.totals[key] += count
+            self.last_export = datetime.datetime.now()
+            return summary
+
+    def status(self):
+        return {
+            "started": self.started.isoformat(),
+            "last_export": self.last_export.isoformat() if self.last_export else None,
+            "exports": self.exports,
+            "totals": self.totals,
+        }
+
+    def handle(self, command):
+        try:
+            if command == "export":
+                return self.export_new()
+            if command == "status":
+                return self.status()
+            return {"error": f"unknown command {command}, expected one of {COMMANDS}"}
+        except Exception as e:
+            logging.exception("Export service command failed")
+            return {"error": str(e)}
+
+    def serve(self, port):
+        """
+        Answer commands on localhost:port from a background thread
+        """
+        service = self
+
+        class CommandHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                command = self.rfile.readline().decode().strip()
+                reply = service.handle(command)
+                self.wfile.write((json.dumps(reply) + "\n").encode())
+
+        server = socketserver.ThreadingTCPServer(("127.0.0.1", port), CommandHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def run(self, poll_interval, port):
+        server = self.serve(port)
+        stop = threading.Event()
+        print(f"Export service listening on port {port}")
+        try:
+            while not stop.is_set():
+                summary = self.handle("export")
+                if summary.get("submissions") or summary.get("exceptions"):
+                    print(f"{datetime.datetime.now():%H:%M:%S} exported {summary}")
+                stop.wait(poll_interval)
+        except KeyboardInterrupt:
+            print("Stopping export service")
+        finally:
+            server.shutdown()
+
+    def _new_submissions(self, status):
+        return list(
+            self.indico_wrapper.iter_submissions(
+                self.config.workflow_id,
+                status,
+                self.config.retrieved,
+                cursor=self.cursor,
+            )
+        )
+
+
+def send_command(port, command):
+    with socket.create_connection(("127.0.0.1", port)) as connection:
+        connection.sendall((command + "\n").encode())
+        reply = connection.makefile().readline()
+    return json.loads(reply)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print(USAGE_STRING)
+        sys.exit()
+
+    configuration_path = sys.argv[1]
+    if not os.path.exists(configuration_path):
+        print(f"configuration file: {configuration_path} does not exist")
+        sys.exit()
+
+    config = ExportConfiguration.from_yaml(configuration_path)
+    if len(sys.argv) == 3:
+        try:
+            print(json.dumps(send_command(config.export_service_port, sys.argv[2])))
+        except ConnectionRefusedError:
+            print(f"no export service is running on port {config.export_service_port}")
+            sys.exit(1)
+        sys.exit()
+
+    timestamp = datetime.datetime.now().strftime("%m_%d_%Y-%I_%M_%S_%p")
+    logging.basicConfig(level=logging.WARNING,
+                    format='%(asctime)s %(message)s',
+                    datefmt='%m-%d %H:%M:%S',
+                    filename=f'{config.log_file_dir}\\{config.log_filename}_service_{timestamp}.log',
+                    filemode='w', force=True)
+    ExportService(config).run(config.export_poll_interval, config.export_service_port)
@@ -2,11 +2,34 @@ import os
 import sys
 from tqdm import tqdm
 from time import sleep
+import numpy as np
 import pandas as pd
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from solutions_toolkit.auto_review import Reviewer, FieldConfiguration
 from solutions_toolkit.uipath_block_scripts.config import ExportConfiguration
-from solutions_toolkit.indico_wrapper import IndicoWrapper
+from solutions_toolkit.uipath_block_scripts.tokens import TokenTable
+from solutions_toolkit.uipath_block_scripts.export_writer import (
+    ExportWriter,
+    export_columns,
+)
+from solutions_toolkit.uipath_block_scripts.ledger import (
+    SubmissionLedger,
+    FETCHED,
+    EXPORTING,
+    EXPORTED,
+    EXCEPTION,
+    MARKED_RETRIEVED,
+)
+from solutions_toolkit.indico_wrapper import (
+    IndicoWrapper,
+    StorageCache,
+    RetryPolicy,
+    RateLimiter,
+    SubmissionCursor,
+    CircuitOpenError,
+)
 import datetime
 import logging
 
@@ -16,40 +39,32 @@ USAGE_STRING = "USAGE: python3 generate_export path/to/configuration_file"
 def assign_confidences(results, model_name):
     """
     Append confidences to predictions
+    final predictions take the confidence of the pre review prediction with
+    the same (start, end, label), the last matching one when there are several
     """
     preds_pre_review = results["results"]["document"]["results"][model_name][
         "pre_review"
     ]
     preds_final = results["results"]["document"]["results"][model_name]["final"]
 
-    for pred_final in preds_final:
+    confidences = {}
+    for pred_pre_review in preds_pre_review:
+        confidences[label_key(pred_pre_review)] = pred_pre_review["confidence"]
 
-        for pred_pre_review in preds_pre_review:
-            if labels_equal(pred_pre_review, pred_final):
-                pred_final["confidence"] = pred_pre_review["confidence"]
+    for pred_final in preds_final:
+        key = label_key(pred_final)
+        if key in confidences:
+            pred_final["confidence"] = confidences[key]
     return preds_final
 
-def labels_equal(label_1, label_2):
-    label_1_start = label_1["start"]
-    label_2_start = label_2["start"]
-    if not label_1_start == label_2_start:
-        return False
 
-    label_1_end = label_1["end"]
-    label_2_end = label_2["end"]
-    if not label_1_end == label_2_end:
-        return False
+def label_key(label):
+    return label["start"], label["end"], label["label"]
 
-    label_1_class = label_1["label"]
-    label_2_class = label_2["label"]
-    if not label_1_class == label_2_class:
-        return False
-
-    return True
 
 def get_page_extractions(indico_wrapper, submission, model_name, post_review=False):
     """
-    Return predictions and page info for a submission
+    Return the token table, predictions and reviewer id for a submission
     post_review is a flag to select either the final reviewed values
     or the pre reviewed values
     """
@@ -64,11 +79,12 @@ def get_page_extractions(indico_wrapper, submission, model_name, post_review=Fal
     etl_output_url = results["etl_output"]
     etl_output = indico_wrapper.get_storage_object(etl_output_url)
 
-    page_infos = []
-    for page in etl_output["pages"]:
-        page_info_url = page["page_info"]
-        page_text_dict = indico_wrapper.get_storage_object(page_info_url)
-        page_infos.append(page_text_dict)
+    # each page's tokens are converted to columns as soon as the page is fetched
+    page_infos = (
+        indico_wrapper.get_storage_object(page["page_info"])
+        for page in etl_output["pages"]
+    )
+    token_table = TokenTable.from_pages(page_infos)
 
     # get predictions
     if result_type == "pre_review":
@@ -81,92 +97,128 @@ def get_page_extractions(indico_wrapper, submission, model_name, post_review=Fal
             predictions = assign_confidences(results, model_name)
 
     reviewer_id = results.get("reviewer_id")
-    return page_infos, predictions, reviewer_id
+    return token_table, predictions, reviewer_id
 
 
-def merge_page_tokens(pages):
+def fetch_page_extractions(
+    indico_wrapper, submissions, model_name, post_review=False, concurrency=1
+):
     """
-    Return a list of tokens from a list of pages
+    Yield (submission, future) pairs in submission order while up to
+    concurrency get_page_extractions calls run in the background
+    future.result() returns the get_page_extractions output and re-raises any
+    exception from the fetch, so callers handle errors exactly as in the
+    serial path
     """
-    tokens = []
-    for page in pages:
-        tokens.extend(page["tokens"])
-    return tokens
+    concurrency = max(concurrency or 1, 1)
+    submission_iter = iter(submissions)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+
+        def submit(submission):
+            future = executor.submit(
+                get_page_extractions,
+                indico_wrapper,
+                submission,
+                model_name,
+                post_review=post_review,
+            )
+            return submission, future
+
+        pending = deque(submit(sub) for sub in islice(submission_iter, concurrency))
+        while pending:
+            submission, future = pending.popleft()
+            # keep the window full while the caller aligns the finished submission
+            for next_submission in islice(submission_iter, 1):
+                pending.append(submit(next_submission))
+            yield submission, future
+
+
+def fetch_submission_results(indico_wrapper, submissions, concurrency=1):
+    """
+    Return the results of each submission in submission order, fetching up to
+    concurrency at a time
+    """
+    concurrency = max(concurrency or 1, 1)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(indico_wrapper.get_submission_results, submissions))
 
 
 def filter_preds(predictions, label_set):
     return [pred for pred in predictions if pred["label"] in label_set]
 
 
-def add_page_number(page_predictions, tokens):
-    for pred in page_predictions:
-        if pred.get("start", None) is not None:
-            for token in tokens:
-                if sequences_overlap(token["doc_offset"], pred):
-                    pred["page_num"] = token["page_num"]
-                    break
-            else:
-                pred["page_num"] = 999
+def add_page_number(page_predictions, token_table):
+    preds = [pred for pred in page_predictions if pred.get("start", None) is not None]
+    rows = token_table.first_overlaps(
+        [pred["start"] for pred in preds], [pred["end"] for pred in preds]
+    )
+    found = rows >= 0
+    page_nums = np.full(len(preds), 999, dtype=np.int64)
+    page_nums[found] = token_table.page_num[rows[found]]
+    for pred, page_num in zip(preds, page_nums.tolist()):
+        pred["page_num"] = page_num
 
 
-def align_rows(row_predictions, tokens, filename):
+def align_rows(row_predictions, token_table, filename):
     """
     Main logic for aligning data
     row_predictions: a list of line item predictions from 1 document
-    tokens: list of token dictionaries from pdf extraction
+    token_table: TokenTable of the tokens from pdf extraction
     filename: string name of file predicted on
     """
 
     # Indico prediction positions are given as spans in the document string
     # these spans need to be resolved with the positioning of the tokens in the doc
-    positions = list()
     page_preds = sorted(row_predictions, key=lambda x: x["start"])
-    for pred in page_preds:
-        position = dict()
-        for token in tokens:
-            if sequences_overlap(token["doc_offset"], pred):
-                position["bbtop"] = token["position"]["bbTop"]
-                position["bbbot"] = token["position"]["bbBot"]
-                position["bbleft"] = token["position"]["bbLeft"]
-                position["bbright"] = token["position"]["bbRight"]
-                position["page_num"] = pred["page_num"]
-                position["label"] = pred["label"]
-                position["text"] = pred["text"]
-                # handle the case where labels are adjusted in review and contain no confidence
-
-                if pred.get("confidence"):
-                    confidence = pred["confidence"].get(position["label"])
-                    if confidence:
-                        position["confidence"] = confidence
-                    else:
-                        position["confidence"] = 1.0
-                else:
-                    position["confidence"] = 1.0
-                break
-        if not position:
+    rows = token_table.first_overlaps(
+        [pred["start"] for pred in page_preds], [pred["end"] for pred in page_preds]
+    )
+    found = rows >= 0
+    rows = rows[found]
+    positions = list()
+    for pred, pred_found in zip(page_preds, found.tolist()):
+        if not pred_found:
             continue
+        position = dict()
+        position["page_num"] = pred["page_num"]
+        position["label"] = pred["label"]
+        position["text"] = pred["text"]
+        # handle the case where labels are adjusted in review and contain no confidence
+
+        if pred.get("confidence"):
+            confidence = pred["confidence"].get(position["label"])
+            if confidence:
+                position["confidence"] = confidence
+            else:
+                position["confidence"] = 1.0
+        else:
+            position["confidence"] = 1.0
         positions.append(position)
 
     new_list = []
     if positions:
         # we now group these values by their y position in the page
-
-        new_positions = sorted(
-            positions, key=lambda x: (x["page_num"], x["bbtop"], x["bbleft"])
-        )
-        max_top = new_positions[0]["bbtop"]
-        min_bot = new_positions[0]["bbbot"]
-        current_page = new_positions[0]["page_num"]
+        bbtops = token_table.bbtop[rows]
+        bbbots = token_table.bbbot[rows]
+        bblefts = token_table.bbleft[rows]
+        page_nums = np.array([position["page_num"] for position in positions])
+        order = np.lexsort((bblefts, bbtops, page_nums))
+
+        bbtops = bbtops[order].tolist()
+        bbbots = bbbots[order].tolist()
+        page_nums = page_nums[order].tolist()
+        max_top, min_bot, current_page = bbtops[0], bbbots[0], page_nums[0]
         row = defaultdict(list)
-        for i in new_positions:
-            if i["bbtop"] > min_bot or i["page_num"] > current_page:
+        for i, bbtop, bbbot, page_num in zip(order.tolist(), bbtops, bbbots, page_nums):
+            position = positions[i]
+            if bbtop > min_bot or page_num > current_page:
                 new_list.append(row)
                 row = defaultdict(list)
-                max_top, min_bot, current_page = i["bbtop"], i["bbbot"], i["page_num"]
-                row[i["label"]].append(i)
+                max_top, min_bot, current_page = bbtop, bbbot, page_num
+                row[position["label"]].append(position)
             else:
-                row[i["label"]].append(i)
-                max_top, min_bot = max(i["bbtop"], max_top), min(i["bbbot"], min_bot)
+                row[position["label"]].append(position)
+                max_top, min_bot = max(bbtop, max_top), min(bbbot, min_bot)
         new_list.append(row)
 
     # convert to a data frame
@@ -263,6 +315,44 @@ def aligned_rows_to_df(aligned_rows):
     return pd.DataFrame(df_rows)
 
 
+def format_export_batch(full_dfs, doc_key_fields, page_key_fields, row_fields):
+    """
+    Combine the per document dataframes of a batch into the export layout,
+    filling document level values down every row of their document
+    """
+    output_df = pd.concat(full_dfs)
+    labels = doc_key_fields + page_key_fields + row_fields
+    col_order = ["filename"]
+    pivot_val_cols = ["text", "confidence"]
+    for label in labels:
+        for pivot_val_col in pivot_val_cols:
+            col_order.append(f"{label} {pivot_val_col}")
+
+    current_cols = set(output_df.columns)
+    missing_cols = list(set(col_order).difference(current_cols))
+    for missing_col in missing_cols:
+        output_df[missing_col] = None
+
+    doc_key_text_cols = [f"{col} text" for col in doc_key_fields]
+    doc_key_conf_cols = [f"{col} confidence" for col in doc_key_fields]
+    output_df.reset_index(drop=True, inplace=True)
+    output_df[doc_key_text_cols] = output_df.groupby(
+        ["filename"], sort=False
+    )[doc_key_text_cols].apply(lambda x: x.ffill().bfill())
+    output_df[doc_key_conf_cols] = output_df.groupby(
+        ["filename"], sort=False
+    )[doc_key_conf_cols].apply(lambda x: x.ffill().bfill())
+    return output_df[col_order]
+
+
+def checkpoint_filepath(export_dir, export_filename):
+    """
+    Path of the ledger that lets an interrupted export resume
+    """
+    export_name = os.path.splitext(export_filename)[0]
+    return os.path.join(export_dir, f"{export_name}_checkpoint.jsonl")
+
+
 def contains_added_text(predictions, fields):
     for pred in predictions:
         if (
@@ -280,25 +370,97 @@ def sequences_overlap(x: dict, y: dict) -> bool:
     return x["start"] < y["end"] and y["start"] < x["end"]
 
 
-if __name__ == "__main__":
-    begin_time = datetime.datetime.now()
-    if len(sys.argv) != 2:
-        print(USAGE_STRING)
-        sys.exit()
-
-    configuration_path = sys.argv[1]
-    if not os.path.exists(configuration_path):
-        print(f"configuration file: {configuration_path} does not exist")
-        sys.exit()
+def list_submissions(indico_wrapper, workflow_id, status, retrieved, cursor=None):
+    """
+    With a cursor the submissions are fetched page by page as they are
+    consumed, marking them retrieved meanwhile does not shift the pages
+    """
+    if cursor is None:
+        return indico_wrapper.get_submissions(workflow_id, status, retrieved)
+    return indico_wrapper.iter_submissions(workflow_id, status, retrieved, cursor=cursor)
 
-    config = ExportConfiguration.from_yaml(configuration_path)
-    FIELD_CONFIG_FILEPATH = config.field_config_filepath
-    if FIELD_CONFIG_FILEPATH:
-        field_config_obj = FieldConfiguration.from_yaml(FIELD_CONFIG_FILEPATH)
-        field_config = field_config_obj.field_config
-    HOST = config.host
-    API_TOKEN_PATH = config.api_token_path
 
+def submission_batches(submissions, batch_size):
+    """
+    Yield lists of up to batch_size submissions, or one list of all of them
+    without a batch_size. A submission listed again because it was updated
+    while the listing was consumed is only yielded once
+    """
+    submissions = iter(submissions)
+    seen_ids = set()
+    while True:
+        listed = list(islice(submissions, batch_size))
+        if not listed:
+            return
+        batch = []
+        for submission in listed:
+            if submission.id not in seen_ids:
+                seen_ids.add(submission.id)
+                batch.append(submission)
+        if batch:
+            yield batch
+
+
+def run_export(
+    config,
+    indico_wrapper,
+    review_plan=None,
+    append=False,
+    complete_submissions=None,
+    exception_submissions=None,
+    cursor=None,
+):
+    """
+    Export the COMPLETE submissions of the workflow and write the exception
+    file for the PENDING_ADMIN_REVIEW ones, marking them retrieved unless
+    DEBUG is set. The submission lists are fetched from the platform unless
+    given.
+
+    With append the export and exception files are added to instead of
+    replaced, the export service uses this to write rows as submissions
+    finish. Returns counts of the submissions, export rows and exceptions.
+
+    cursor is the SubmissionCursor the given submissions were listed with, it
+    is only advanced past the submissions this run handled and saved once
+    the run has finished.
+
+    When a circuit breaker opens the run stops with CircuitOpenError, the
+    cursor is saved past the submissions handled so far and the checkpoint
+    is kept so the next run resumes from it.
+    """
+    # with a cursor file only submissions updated since the last finished run
+    # are listed, the cursor is only saved once this run has finished. Callers
+    # passing the submissions pass the cursor they listed them with, if any
+    listing = complete_submissions is None and exception_submissions is None
+    if cursor is None and config.submission_cursor_file and listing:
+        cursor = SubmissionCursor(config.submission_cursor_file)
+    try:
+        return _run_export(
+            config,
+            indico_wrapper,
+            review_plan,
+            append,
+            complete_submissions,
+            exception_submissions,
+            cursor,
+        )
+    except CircuitOpenError as e:
+        if cursor is not None:
+            cursor.save()
+        logging.warning(f"Stopping the export, re-run it to resume: {e}")
+        raise
+
+
+def _run_export(
+    config,
+    indico_wrapper,
+    review_plan,
+    append,
+    complete_submissions,
+    exception_submissions,
+    cursor,
+):
+    begin_time = datetime.datetime.now()
     WORKFLOW_ID = config.workflow_id
     MODEL_NAME = config.model_name
 
@@ -307,70 +469,129 @@ if __name__ == "__main__":
     ROW_FIELDS = config.row_fields
     POST_PROCESSING = config.post_processing
     BATCH_SIZE = config.export_batch_size
+    FETCH_CONCURRENCY = config.fetch_concurrency
 
     EXPORT_DIR = config.export_dir
     EXPORT_FILENAME = config.export_filename
     EXCEPTION_FILENAME = config.exception_filename
     DEBUG = config.debug
     STP = config.stp
-    LOG_FILE_DIR = config.log_file_dir
-    LOG_FILENAME = config.log_filename
     EXCEPTION_STATUS = "PENDING_ADMIN_REVIEW"
     COMPLETE_STATUS = "COMPLETE"
 
-    indico_wrapper = IndicoWrapper(HOST, API_TOKEN_PATH)
     retrieved = config.retrieved
     post_review = not STP
     exception_ids = []
     exception_filenames = []
-    complete_ids = []
-    complete_filenames = []
-    sub_job = []
-    result = []
-    complete_revID = []
     exceptions_revID = []
 
-    timestamp = datetime.datetime.now().strftime("%m_%d_%Y-%I_%M_%S_%p")
-    logging.basicConfig(level=logging.WARNING,
-                    format='%(asctime)s %(message)s',
-                    datefmt='%m-%d %H:%M:%S',
-                    filename=f'{LOG_FILE_DIR}\\{LOG_FILENAME}_{timestamp}.log',
-                    filemode='w', force=True)
+    # submissions finished by an interrupted run are skipped, their exports
+    # are already in the export file and their exceptions are kept. The
+    # export file is only appended to when that run exported something
+    ledger = SubmissionLedger(checkpoint_filepath(EXPORT_DIR, EXPORT_FILENAME))
+    resuming = len(ledger) > 0
+    # a batch recorded as exporting but never as exported may be partly or
+    # fully in the file, it is cut off and the whole batch is done again
+    unfinished_offsets = {
+        entry["submission_id"]: entry["offset"]
+        for entry in ledger.entries(EXPORTING)
+        if not ledger.has(entry["submission_id"], EXPORTED)
+    }
+    for entry in ledger.entries(EXCEPTION):
+        if entry["submission_id"] in unfinished_offsets:
+            continue
+        exception_ids.append(entry["submission_id"])
+        exception_filenames.append(entry["filename"])
+        exceptions_revID.append(entry["reviewer_id"])
+
+    output_filepath = os.path.join(EXPORT_DIR, EXPORT_FILENAME)
+    export_writer = ExportWriter(
+        output_filepath,
+        export_columns(DOC_KEY_FIELDS, PAGE_KEY_FIELDS, ROW_FIELDS),
+        append=bool(ledger.entries(EXPORTED) or unfinished_offsets) or append,
+    )
+    if unfinished_offsets:
+        export_writer.truncate(min(unfinished_offsets.values()))
+
+    if resuming:
+        logging.warning(f"Resuming export from checkpoint {ledger.filepath}")
+
+    def mark_retrieved(submissions):
+        """
+        Bulk mark submissions retrieved, skipping the ones the ledger already
+        has marked, failures stop the run so a re-run can retry them
+        """
+        submission_ids = []
+        for sub in submissions:
+            if not ledger.has(sub.id, MARKED_RETRIEVED):
+                logging.warning(f"Marking file {sub.input_filename} with Submission ID {sub.id} as retrieved")
+                submission_ids.append(sub.id)
+        failures = indico_wrapper.mark_retrieved_many(submission_ids)
+        ledger.record_many(
+            [sub_id for sub_id in submission_ids if int(sub_id) not in failures],
+            MARKED_RETRIEVED,
+        )
+        if failures:
+            for sub_id, error in failures.items():
+                logging.warning(f"Failed to mark Submission ID {sub_id} as retrieved: {error}")
+            raise ConnectionError(
+                f"Could not mark {len(failures)} submissions as retrieved, please re-run the script"
+            )
+
     logging.warning("Getting the list of reviewed submissions from Indico")
 
     # To export COMPLETE submissions
-    complete_submissions = indico_wrapper.get_submissions(
-        WORKFLOW_ID, COMPLETE_STATUS, retrieved
-    )
-    logging.warning(f"Time:{(datetime.datetime.now() - begin_time).seconds} seconds")
-    total_submissions = len(complete_submissions)
-    logging.warning(f"{total_submissions} submissions have been obtained")
-    if BATCH_SIZE is None:
-        BATCH_SIZE = total_submissions
-
-    print(f"Starting processing of {total_submissions} submissions")
-    logging.warning(f"Starting processing of {total_submissions} submissions")
-    if complete_submissions:
-        batched_submissions = range(0, len(complete_submissions), BATCH_SIZE)
-    else:
-        batched_submissions = []
-        print("No COMPLETE submissions to generate export")
-        logging.warning("No COMPLETE submissions to generate export")
+    if complete_submissions is None:
+        complete_submissions = list_submissions(
+            indico_wrapper, WORKFLOW_ID, COMPLETE_STATUS, retrieved, cursor
+        )
 
-    for batch_num, batch_start in enumerate(batched_submissions):
-        batch_end = batch_start + BATCH_SIZE
-        submission_batch = complete_submissions[batch_start:batch_end]
+    def advance_cursor(status, submissions):
+        # the cursor only moves past submissions this run has handled
+        if cursor is not None:
+            for submission in submissions:
+                cursor.advance(WORKFLOW_ID, status, submission)
+
+    total_submissions = 0
+    for batch_num, listed_batch in enumerate(
+        submission_batches(complete_submissions, BATCH_SIZE)
+    ):
+        finished_ids = {
+            sub.id for sub in listed_batch
+            if (ledger.has(sub.id, EXPORTED) or ledger.has(sub.id, EXCEPTION))
+            and int(sub.id) not in unfinished_offsets
+        }
+        if finished_ids:
+            finished_batch = [sub for sub in listed_batch if sub.id in finished_ids]
+            logging.warning(f"Skipping {len(finished_ids)} submissions finished by a previous run")
+            if not DEBUG:
+                mark_retrieved(finished_batch)
+            advance_cursor(COMPLETE_STATUS, finished_batch)
+        submission_batch = [sub for sub in listed_batch if sub.id not in finished_ids]
+        if not submission_batch:
+            continue
+        total_submissions += len(submission_batch)
         # FULL WORK FLOW
         full_dfs = []
+        complete_ids = []
+        complete_filenames = []
+        complete_revID = []
+        batch_exceptions = []
         print(f"Starting Batch {batch_num+1}")
         logging.warning(f"Starting Batch {batch_num+1}")
-        for submission in tqdm(submission_batch):
+        fetched_batch = fetch_page_extractions(
+            indico_wrapper,
+            submission_batch,
+            MODEL_NAME,
+            post_review=post_review,
+            concurrency=FETCH_CONCURRENCY,
+        )
+        for submission, extraction in tqdm(fetched_batch, total=len(submission_batch)):
             logging.warning(f"Time:{(datetime.datetime.now() - begin_time).seconds} seconds")
             logging.warning(f"Extracting data for {submission.input_filename} : {submission.id}")
             try:
-                page_infos, predictions, reviewer_id = get_page_extractions(
-                    indico_wrapper, submission, MODEL_NAME, post_review=post_review
-                )
+                token_table, predictions, reviewer_id = extraction.result()
+                ledger.record(submission.id, FETCHED)
                 complete_revID.append(reviewer_id)
                 complete_ids.append(submission.id)
                 complete_filenames.append(submission.input_filename)
@@ -379,7 +600,7 @@ if __name__ == "__main__":
                     if POST_PROCESSING:
                         inital_predictions = {MODEL_NAME: predictions}
                         reviewer = Reviewer(
-                            inital_predictions, MODEL_NAME, field_config
+                            inital_predictions, MODEL_NAME, review_plan
                         )
                         reviewer.apply_reviews()
                         predictions = reviewer.get_updated_predictions()[MODEL_NAME]
@@ -390,13 +611,16 @@ if __name__ == "__main__":
                         exception_ids.append(int(submission.id))
                         exception_filenames.append(str(submission.input_filename))
                         exceptions_revID.append(str(reviewer_id))
-                        logging.warning(f"Marking {submission.input_filename}:{submission.id} as retrieved")
-                        if not DEBUG:
-                            indico_wrapper.mark_retreived(submission)
+                        ledger.record(
+                            submission.id,
+                            EXCEPTION,
+                            filename=str(submission.input_filename),
+                            reviewer_id=str(reviewer_id),
+                        )
+                        batch_exceptions.append(submission)
                         continue
 
-                    tokens = merge_page_tokens(page_infos)
-                    add_page_number(predictions, tokens)
+                    add_page_number(predictions, token_table)
                     doc_key_predictions = filter_preds(predictions, DOC_KEY_FIELDS)
                     page_key_predictions = filter_preds(predictions, PAGE_KEY_FIELDS)
                     row_predictions = filter_preds(predictions, ROW_FIELDS)
@@ -422,7 +646,7 @@ if __name__ == "__main__":
 
                     if row_predictions:
                         line_item_df = align_rows(
-                            row_predictions, tokens, submission.input_filename
+                            row_predictions, token_table, submission.input_filename
                         )
 
                     # TODO: this logic is gross
@@ -459,34 +683,20 @@ if __name__ == "__main__":
             except ConnectionError:
                 exception_ids.append(int(submission.id))
                 exception_filenames.append(str(submission.input_filename))
-                if not DEBUG:
-                    indico_wrapper.mark_retreived(submission)
+                exceptions_revID.append(None)
+                ledger.record(
+                    submission.id,
+                    EXCEPTION,
+                    filename=str(submission.input_filename),
+                    reviewer_id=None,
+                )
+                batch_exceptions.append(submission)
                 continue
 
         if full_dfs:
-            output_df = pd.concat(full_dfs)
-            labels = DOC_KEY_FIELDS + PAGE_KEY_FIELDS + ROW_FIELDS
-            col_order = ["filename"]
-            pivot_val_cols = ["text", "confidence"]
-            for label in labels:
-                for pivot_val_col in pivot_val_cols:
-                    col_order.append(f"{label} {pivot_val_col}")
-
-            current_cols = set(output_df.columns)
-            missing_cols = list(set(col_order).difference(current_cols))
-            for missing_col in missing_cols:
-                output_df[missing_col] = None
-
-            doc_key_text_cols = [f"{col} text" for col in DOC_KEY_FIELDS]
-            doc_key_conf_cols = [f"{col} confidence" for col in DOC_KEY_FIELDS]
-            output_df.reset_index(drop=True, inplace=True)
-            output_df[doc_key_text_cols] = output_df.groupby(
-                ["filename"], sort=False
-            )[doc_key_text_cols].apply(lambda x: x.ffill().bfill())
-            output_df[doc_key_conf_cols] = output_df.groupby(
-                ["filename"], sort=False
-            )[doc_key_conf_cols].apply(lambda x: x.ffill().bfill())
-            output_df = output_df[col_order]
+            output_df = format_export_batch(
+                full_dfs, DOC_KEY_FIELDS, PAGE_KEY_FIELDS, ROW_FIELDS
+            )
 
             reviewer_filename_df = pd.DataFrame(
                 {"Submission ID":complete_ids,"filename": complete_filenames, "Reviewer ID": complete_revID}
@@ -496,37 +706,70 @@ if __name__ == "__main__":
                 reviewer_filename_df, output_df, on="filename", how="outer"
             )
 
-            output_filepath = os.path.join(EXPORT_DIR, EXPORT_FILENAME)
-            output_df.to_csv(output_filepath, index=False)
+            ledger.record_many(complete_ids, EXPORTING, offset=export_writer.offset())
+            export_writer.write_batch(output_df)
+            ledger.record_many(complete_ids, EXPORTED)
             print(f"Generated export {output_filepath}")
-            total_processed = min(batch_end, total_submissions)
-            print(f"Processed {total_processed}/ {total_submissions}")
+            print(f"Processed {total_submissions} submissions")
             print("An export file has been generated")
             logging.warning(f"Time:{(datetime.datetime.now() - begin_time).seconds} seconds")
             logging.warning("An export file has been generated")
 
             if not DEBUG:
-                for sub in submission_batch:
-                    logging.warning(f"Marking file {sub.input_filename} with Submission ID {sub.id} as retrieved")
-                    indico_wrapper.mark_retreived(sub)
+                mark_retrieved(submission_batch)
             logging.warning(f"Time:{(datetime.datetime.now() - begin_time).seconds} seconds") 
             logging.warning("All COMPLETE submissions have been marked retrieved")
-    EXCEPTION_STATUS = "PENDING_ADMIN_REVIEW"
+
+        # exceptions are marked retrieved whether or not the batch has an
+        # export, only once it is written so a re-run lists the whole batch
+        if batch_exceptions and not DEBUG:
+            mark_retrieved(batch_exceptions)
+        advance_cursor(
+            COMPLETE_STATUS,
+            [
+                sub for sub in submission_batch
+                if ledger.has(sub.id, EXPORTED) or ledger.has(sub.id, EXCEPTION)
+            ],
+        )
+
+    if total_submissions:
+        logging.warning(f"{total_submissions} COMPLETE submissions have been processed")
+    else:
+        print("No COMPLETE submissions to generate export")
+        logging.warning("No COMPLETE submissions to generate export")
+
     logging.warning("Getting the list of rejected submissions from Indico")
-    exception_submissions = indico_wrapper.get_submissions(
-        WORKFLOW_ID, EXCEPTION_STATUS, retrieved
-    )
-    logging.warning(f"Time:{(datetime.datetime.now() - begin_time).seconds} seconds")    
-    logging.warning("Rejected submissions list has been obtained")  
+    if exception_submissions is None:
+        exception_submissions = list_submissions(
+            indico_wrapper, WORKFLOW_ID, EXCEPTION_STATUS, retrieved, cursor
+        )
     # Creating a DataFrame to store Exception Submission IDs and their corresponding filenames
+    logging.warning("Beginning to create the exceptions file")
+    for exception_batch in submission_batches(exception_submissions, BATCH_SIZE):
+        new_exception_submissions = [
+            es for es in exception_batch if not ledger.has(es.id, EXCEPTION)
+        ]
+        exception_results = fetch_submission_results(
+            indico_wrapper, new_exception_submissions, concurrency=FETCH_CONCURRENCY
+        )
+        for es, result in zip(new_exception_submissions, exception_results):
+            exception_ids.append(int(es.id))
+            exception_filenames.append(str(es.input_filename))
+            exceptions_revID.append(result.get("reviewer_id"))
+            ledger.record(
+                es.id,
+                EXCEPTION,
+                filename=str(es.input_filename),
+                reviewer_id=result.get("reviewer_id"),
+            )
+        if not DEBUG:
+            mark_retrieved(exception_batch)
+        advance_cursor(EXCEPTION_STATUS, exception_batch)
+    logging.warning(f"Time:{(datetime.datetime.now() - begin_time).seconds} seconds")
+    logging.warning(f"{len(exception_ids)} rejected submissions have been obtained")
+    if not DEBUG:
+        logging.warning("All rejected submissions have been marked retrieved")
 
-    logging.warning(f"Beginning to create the exceptions file with {len(exception_submissions)} submissions")
-    for es in exception_submissions:
-        exception_ids.append(int(es.id))
-        exception_filenames.append(str(es.input_filename))
-        result = indico_wrapper.get_submission_results(es)
-        exceptions_revID.append(result.get("reviewer_id"))
-    
     exceptions_df = pd.DataFrame(
         {
             "Submission ID": exception_ids,
@@ -535,16 +778,70 @@ if __name__ == "__main__":
         }
     )
 
-    if not DEBUG:
-        for sub in exception_submissions:
-            logging.warning(f"Marking file {sub.input_filename} with Submission ID {sub.id} as retrieved")
-            indico_wrapper.mark_retreived(sub)
-        logging.warning(f"Time:{(datetime.datetime.now() - begin_time).seconds} seconds") 
-        logging.warning("All rejected submissions have been marked retrieved")
     # Exporting Exception files and their Submission IDs as a CSV
     exception_filepath = os.path.join(EXPORT_DIR, EXCEPTION_FILENAME)
-    exceptions_df.to_csv(exception_filepath, index=False)
+    if append and os.path.exists(exception_filepath):
+        exceptions_df.to_csv(exception_filepath, mode="a", header=False, index=False)
+    else:
+        exceptions_df.to_csv(exception_filepath, index=False)
     logging.warning(f"Time:{(datetime.datetime.now() - begin_time).seconds} seconds")
     logging.warning("An exception file has been generated")
     print(f"Generated exceptions {exception_filepath}")
     print("An exception file has been generated")
+    # the run finished, the next one starts a fresh export
+    if cursor is not None:
+        cursor.save()
+    ledger.clear()
+    if indico_wrapper.storage_cache is not None:
+        logging.warning(f"Storage cache stats: {indico_wrapper.storage_cache.stats()}")
+    return {
+        "submissions": total_submissions,
+        "rows": export_writer.rows_written,
+        "exceptions": len(exception_ids),
+    }
+
+
+def create_indico_wrapper(config):
+    if config.storage_cache_dir:
+        storage_cache = StorageCache(
+            config.storage_cache_dir, max_mb=config.storage_cache_max_mb
+        )
+    else:
+        storage_cache = None
+    return IndicoWrapper(
+        config.host,
+        config.api_token_path,
+        storage_cache=storage_cache,
+        retry_policy=RetryPolicy.from_config(config),
+        rate_limiter=RateLimiter.from_config(config),
+    )
+
+
+def load_review_plan(config):
+    if config.field_config_filepath:
+        return FieldConfiguration.from_yaml(config.field_config_filepath).review_plan
+    return None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(USAGE_STRING)
+        sys.exit()
+
+    configuration_path = sys.argv[1]
+    if not os.path.exists(configuration_path):
+        print(f"configuration file: {configuration_path} does not exist")
+        sys.exit()
+
+    config = ExportConfiguration.from_yaml(configuration_path)
+    timestamp = datetime.datetime.now().strftime("%m_%d_%Y-%I_%M_%S_%p")
+    logging.basicConfig(level=logging.WARNING,
+                    format='%(asctime)s %(message)s',
+                    datefmt='%m-%d %H:%M:%S',
+                    filename=f'{config.log_file_dir}\\{config.log_filename}_{timestamp}.log',
+                    filemode='w', force=True)
+    try:
+        run_export(config, create_indico_wrapper(config), load_review_plan(config))
+    except CircuitOpenError as e:
+        print(f"Indico is unavailable, re-run the script to resume the export: {e}")
+        sys.exit(1)
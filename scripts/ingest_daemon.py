@@ -0,0 +1,253 @@
+"""
+Long running version of workflow_upload.py
+
+Watches DOCUMENT_INPUT_DIR and uploads documents in micro-batches as soon as
+they are fully written, instead of waiting for the next scheduled run. A
+batch is sent once it reaches INGEST_BATCH_SIZE files or its oldest file has
+waited INGEST_BATCH_DELAY seconds. Queue depth, upload counts and latency from
+a file being seen to it being uploaded are logged and, with
+INGEST_METRICS_FILE set, written there as json after every batch.
+
+Files that did not get a submission are retried RETRY_DELAY seconds later
+while other files keep being uploaded, after INGEST_MAX_ATTEMPTS failed
+uploads a file is moved to INGEST_FAILED_DIR and logged. A file that got a
+submission is never uploaded again, even if waiting for it failed.
+
+Stop it with Ctrl+C, files still queued stay in DOCUMENT_INPUT_DIR.
+"""
+
+import os
+import sys
+import json
+import logging
+from time import time, monotonic
+from collections import deque
+
+from workflow_upload import WorkflowUpload
+from solutions_toolkit.uipath_block_scripts.config import ExportConfiguration
+from solutions_toolkit.uipath_block_scripts.utils import move_file
+from solutions_toolkit.uipath_block_scripts.watcher import create_watcher
+
+
+USAGE_STRING = "USAGE: python3 ingest_daemon.py path/to/config.yaml"
+# latencies kept for the percentiles in the metrics
+LATENCY_WINDOW = 1000
+# seconds to wait before retrying files whose upload failed
+RETRY_DELAY = 30
+# failed uploads of a file before it is moved to the failed directory
+MAX_ATTEMPTS = 5
+
+
+class IngestMetrics:
+    def __init__(self, filepath=None):
+        self.filepath = filepath
+        self.started = time()
+        self.queue_depth = 0
+        self.files_uploaded = 0
+        self.batches_uploaded = 0
+        self.upload_failures = 0
+        self.files_failed = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def snapshot(self):
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))], 3)
+
+        return {
+            "uptime_seconds": round(time() - self.started, 1),
+            "queue_depth": self.queue_depth,
+            "files_uploaded": self.files_uploaded,
+            "batches_uploaded": self.batches_uploaded,
+            "upload_failures": self.upload_failures,
+            "files_failed": self.files_failed,
+            "latency_p50_seconds": percentile(0.5),
+            "latency_p95_seconds": percentile(0.95),
+            "latency_max_seconds": round(latencies[-1], 3) if latencies else None,
+        }
+
+    def publish(self):
+        snapshot = self.snapshot()
+        logging.info(f"ingest metrics: {snapshot}")
+        if self.filepath:
+            tmp_path = f"{self.filepath}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(snapshot, f, indent=2)
+            os.replace(tmp_path, self.filepath)
+
+
+class IngestDaemon:
+    def __init__(
+        self,
+        workflow_upload,
+        watcher,
+        batch_size,
+        batch_delay,
+        wait,
+        metrics,
+        failed_dir,
+        max_attempts=MAX_ATTEMPTS,
+    ):
+        self.workflow_upload = workflow_upload
+        self.watcher = watcher
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.wait = wait
+        self.metrics = metrics
+        self.failed_dir = failed_dir
+        self.max_attempts = max_attempts
+        # (filepath, monotonic time the file was seen) in arrival order
+        self.queue = deque()
+        self.queued = set()
+        # failed uploads of the files still queued
+        self.attempts = {}
+        # (monotonic time to retry at, filepath, seen at) of failed files
+        self.retrying = []
+
+    def run(self):
+        while True:
+            self.enqueue(self.watcher.poll(self._poll_timeout()))
+            self.requeue_due()
+            if self._batch_due():
+                self.upload_batch()
+
+    def enqueue(self, filepaths):
+        seen_at = monotonic()
+        for filepath in filepaths:
+            if filepath not in self.queued and os.path.exists(filepath):
+                self.queue.append((filepath, seen_at))
+                self.queued.add(filepath)
+        self._update_queue_depth()
+
+    def requeue_due(self):
+        """
+        Put the failed files whose retry time has come back at the front of
+        the queue in the order they failed
+        """
+        now = monotonic()
+        due = [entry for entry in self.retrying if entry[0] <= now]
+        if not due:
+            return
+        self.retrying = [entry for entry in self.retrying if entry[0] > now]
+        self.queue.extendleft(reversed([(filepath, seen_at) for _, filepath, seen_at in due]))
+        self._update_queue_depth()
+
+    def upload_batch(self):
+        batch = [self.queue.popleft() for _ in range(min(self.batch_size, len(self.queue)))]
+        filepaths = [filepath for filepath, _ in batch]
+        try:
+            self.workflow_upload.upload_to_workflow(filepaths, wait=self.wait)
+        except Exception as e:
+            logging.error(f"upload of {len(filepaths)} files failed: {e}")
+        self.workflow_upload.failed_files.clear()
+        self.workflow_upload.wait_failed_ids.clear()
+
+        now = monotonic()
+        failed = []
+        for filepath, seen_at in batch:
+            # a file is only uploaded again if it never got a submission
+            if self.workflow_upload.submitted_files.pop(filepath, None) is None:
+                if os.path.exists(filepath):
+                    failed.append((filepath, seen_at))
+                else:
+                    logging.warning(f"{filepath} was removed before it was uploaded")
+                    self.queued.discard(filepath)
+                    self.attempts.pop(filepath, None)
+                continue
+            self.queued.discard(filepath)
+            self.attempts.pop(filepath, None)
+            self.metrics.latencies.append(now - seen_at)
+            self.metrics.files_uploaded += 1
+        self.metrics.batches_uploaded += 1
+        self.metrics.upload_failures += len(failed)
+
+        for filepath, seen_at in failed:
+            self.attempts[filepath] = self.attempts.get(filepath, 0) + 1
+            if self.attempts[filepath] >= self.max_attempts:
+                self.move_to_failed(filepath)
+            else:
+                self.retrying.append((now + RETRY_DELAY, filepath, seen_at))
+        self._update_queue_depth()
+        self.metrics.publish()
+
+    def move_to_failed(self, filepath):
+        """
+        Stop retrying filepath and move it out of DOCUMENT_INPUT_DIR
+        """
+        self.queued.discard(filepath)
+        attempts = self.attempts.pop(filepath)
+        self.metrics.files_failed += 1
+        try:
+            os.makedirs(self.failed_dir, exist_ok=True)
+            move_file(filepath, self.failed_dir)
+        except OSError as e:
+            logging.error(
+                f"{filepath} failed to upload {attempts} times and could not be "
+                f"moved to {self.failed_dir}, it will not be retried: {e}"
+            )
+            return
+        logging.error(
+            f"{filepath} failed to upload {attempts} times, moved to {self.failed_dir}"
+        )
+
+    def _batch_due(self):
+        if not self.queue:
+            return False
+        if len(self.queue) >= self.batch_size:
+            return True
+        return monotonic() - self.queue[0][1] >= self.batch_delay
+
+    def _poll_timeout(self):
+        if self.queue:
+            timeout = max(0, self.batch_delay - (monotonic() - self.queue[0][1]))
+        else:
+            timeout = self.batch_delay
+        if self.retrying:
+            next_retry = min(retry_at for retry_at, _, _ in self.retrying)
+            timeout = min(timeout, max(0, next_retry - monotonic()))
+        return timeout
+
+    def _update_queue_depth(self):
+        self.metrics.queue_depth = len(self.queue) + len(self.retrying)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(USAGE_STRING)
+        sys.exit()
+
+    configuration_path = sys.argv[1]
+    if not os.path.exists(configuration_path):
+        print(f"configuration file: {configuration_path} does not exist")
+        sys.exit()
+
+    logging.basicConfig(
+        format="%(asctime)s %(levelname)s %(message)s", level=logging.INFO
+    )
+    config = ExportConfiguration.from_yaml(configuration_path)
+    watcher = create_watcher(
+        config.document_input_dir, "*.pdf", poll_interval=config.ingest_poll_interval
+    )
+    logging.info(
+        f"watching {config.document_input_dir} with {type(watcher).__name__}"
+    )
+    daemon = IngestDaemon(
+        WorkflowUpload(config),
+        watcher,
+        batch_size=config.ingest_batch_size or config.upload_batch_size,
+        batch_delay=config.ingest_batch_delay,
+        wait=config.wait,
+        metrics=IngestMetrics(config.ingest_metrics_file),
+        failed_dir=config.ingest_failed_dir
+        or os.path.join(config.document_input_dir, "failed"),
+        max_attempts=config.ingest_max_attempts,
+    )
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        logging.info(f"stopping with {len(daemon.queue)} files still queued")
+    finally:
+        watcher.close()
@@ -7,5 +7,7 @@ workflow_id = 206
 indico_wrapper = IndicoWrapper(host, api_token_path)
 complete_submissions = indico_wrapper.get_submissions(workflow_id, "COMPLETE", retrieved_flag=False)
 
-for submission in complete_submissions:
-    indico_wrapper.mark_retreived(submission)
+failures = indico_wrapper.mark_retrieved_many([sub.id for sub in complete_submissions])
+print(f"Marked {len(complete_submissions) - len(failures)}/{len(complete_submissions)} submissions retrieved")
+for submission_id, error in failures.items():
+    print(f"Failed to mark submission {submission_id}: {error}")
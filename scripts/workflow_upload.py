@@ -6,14 +6,28 @@ STP.
 
 import sys
 import os
+import threading
+from time import sleep, monotonic
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED
+from concurrent.futures import wait as wait_for_futures
 from tqdm import tqdm 
+from indico.errors import IndicoTimeoutError
 
 from solutions_toolkit.uipath_block_scripts.utils import files_from_directory, move_file
 from solutions_toolkit.uipath_block_scripts.config import ExportConfiguration
-from solutions_toolkit.indico_wrapper import IndicoWrapper
+from solutions_toolkit.uipath_block_scripts.upload_rate import (
+    ProcessingRate,
+    pdf_page_count,
+    TIMEOUT_SAFETY_FACTOR,
+)
+from solutions_toolkit.uipath_block_scripts.upload_ledger import UploadLedger, hash_files
+from solutions_toolkit.indico_wrapper import IndicoWrapper, RateLimiter
 
 
 USAGE_STRING = "USAGE: python3 workflow_upload.py path/to/config.yaml"
+# seconds between status checks of the submissions still processing
+POLL_INTERVAL = 5
 
 
 class WorkflowUpload:
@@ -22,31 +36,377 @@ class WorkflowUpload:
         self.workflow_id = config.workflow_id
         self.uploaded_dir = config.uploaded_dir
         self.timeout = config.timeout
-        self.indico_wrapper = IndicoWrapper(config.host, config.api_token_path)
+        self.pipeline_depth = config.upload_pipeline_depth
+        self.workers = config.upload_workers
+        # with a target batch time, batches are sized from each document's
+        # page count and the processing rate learned from earlier batches
+        self.batch_seconds = config.adaptive_batch_seconds
+        if self.batch_seconds:
+            self.processing_rate = ProcessingRate(config.upload_rate_file)
+        else:
+            self.processing_rate = None
+        self.page_counts = {}
+        # sha256 ledger of uploaded documents, used to link re-dropped files to
+        # their existing submission instead of uploading them again
+        if config.upload_ledger_db:
+            self.upload_ledger = UploadLedger(config.upload_ledger_db)
+        else:
+            self.upload_ledger = None
+        self.file_hashes = {}
+        # {filepath: submission id} of every file uploaded or linked to an
+        # earlier submission, callers retrying files pop their entries
+        self.submitted_files = {}
+        self.duplicate_files = 0
+        self.uploaded_files = 0
+        self.uploaded_bytes = 0
+        self.failed_files = []
+        # submissions of the parallel path that were created but whose wait
+        # for processing failed, their files are already in uploaded_dir
+        self.wait_failed_ids = []
+        self._stats_lock = threading.Lock()
+        self.indico_wrapper = IndicoWrapper(
+            config.host,
+            config.api_token_path,
+            rate_limiter=RateLimiter.from_config(config),
+        )
 
     def upload_to_workflow(self, pdf_filepaths, wait=False):
+        pdf_filepaths, pending_duplicates = self.skip_duplicates(pdf_filepaths)
+        try:
+            if self.workers > 1:
+                return self.parallel_upload(pdf_filepaths, wait=wait)
+            if wait and self.pipeline_depth > 1:
+                return self.pipelined_upload(pdf_filepaths)
+            return self.serial_upload(pdf_filepaths, wait=wait)
+        finally:
+            # copies of a file uploaded in this run can be linked now
+            self._link_duplicates(pending_duplicates)
+            if self.processing_rate is not None:
+                self.processing_rate.save()
+                print(
+                    "learned processing rate: "
+                    f"{self.processing_rate.pages_per_second:.2f} pages/sec"
+                )
+
+    def serial_upload(self, pdf_filepaths, wait=False):
         submission_ids = []
         total_uploaded = len(pdf_filepaths)
         batch_count = 0
-        for batch_start in tqdm(range(0, len(pdf_filepaths), self.batch_size)):
-            batch_end = batch_start + self.batch_size
-            pdf_batch = pdf_filepaths[batch_start:batch_end]
-
+        for pdf_batch in self._progress(pdf_filepaths):
+            started = monotonic()
             batch_submission_ids = self.indico_wrapper.upload_to_workflow(
                 self.workflow_id, pdf_batch
             )
             submission_ids.append(batch_submission_ids)
+            self._record_uploaded(pdf_batch, batch_submission_ids)
+            self._move_uploaded(pdf_batch)
 
             if wait:
-                self.indico_wrapper.wait_for_submission(batch_submission_ids, timeout=self.timeout)
-
-            for pdf_filepath in pdf_batch:
-                move_file(pdf_filepath, self.uploaded_dir)
+                self.indico_wrapper.wait_for_submission(
+                    batch_submission_ids, timeout=self.batch_timeout(pdf_batch)
+                )
+                self._observe(pdf_batch, monotonic() - started)
 
             batch_count += len(pdf_batch)
             print(f"completed upload of {batch_count}/{total_uploaded}")
         return submission_ids
 
+    def pipelined_upload(self, pdf_filepaths):
+        """
+        Upload the next batch while up to pipeline_depth earlier batches are
+        still processing. A batch's files are moved as soon as its submissions
+        are created, the statuses of all outstanding submissions are polled
+        with one call and a batch is done once none of its submissions are
+        processing. Raises IndicoTimeoutError if a batch is still processing
+        timeout seconds after its upload.
+        """
+        submission_ids = []
+        in_flight = []
+        total_uploaded = len(pdf_filepaths)
+        batch_count = 0
+        for pdf_batch in self._progress(pdf_filepaths):
+            while len(in_flight) >= self.pipeline_depth:
+                batch_count += self._retire_finished(in_flight)
+                print(f"completed upload of {batch_count}/{total_uploaded}")
+
+            started = monotonic()
+            batch_submission_ids = self.indico_wrapper.upload_to_workflow(
+                self.workflow_id, pdf_batch
+            )
+            submission_ids.append(batch_submission_ids)
+            self._record_uploaded(pdf_batch, batch_submission_ids)
+            self._move_uploaded(pdf_batch)
+            in_flight.append(
+                (
+                    batch_submission_ids,
+                    pdf_batch,
+                    started,
+                    started + self.batch_timeout(pdf_batch),
+                )
+            )
+
+        while in_flight:
+            batch_count += self._retire_finished(in_flight)
+            print(f"completed upload of {batch_count}/{total_uploaded}")
+        return submission_ids
+
+    def _retire_finished(self, in_flight):
+        """
+        Wait until at least one in flight batch has finished processing, then
+        remove it from in_flight and return the number of files it has
+        """
+        while True:
+            outstanding_ids = [
+                submission_id
+                for batch_submission_ids, _, _, _ in in_flight
+                for submission_id in batch_submission_ids
+            ]
+            processing_ids = {
+                submission.id
+                for submission in self.indico_wrapper.get_submissions_by_ids(
+                    outstanding_ids
+                )
+                if submission.status == "PROCESSING"
+            }
+            # batches are timed to this poll, not to when they are retired
+            polled_at = monotonic()
+
+            finished = [
+                batch
+                for batch in in_flight
+                if not processing_ids.intersection(map(int, batch[0]))
+            ]
+            for batch in finished:
+                in_flight.remove(batch)
+                self._observe(batch[1], polled_at - batch[2])
+            if finished:
+                return sum(len(batch[1]) for batch in finished)
+
+            for _, _, started, deadline in in_flight:
+                if deadline < monotonic():
+                    raise IndicoTimeoutError(deadline - started)
+            sleep(POLL_INTERVAL)
+
+    def parallel_upload(self, pdf_filepaths, wait=False):
+        """
+        Upload batches from workers concurrent submission calls. Each worker
+        moves a batch's files once its submissions are created, and then waits
+        for them to finish processing when wait is set. A batch whose upload
+        fails is reported in failed_files and its files stay in place for a
+        re-run, a batch whose wait fails has its ids in wait_failed_ids.
+        The next batch is only sized once a worker is free for it, so adaptive
+        batches follow the rate learned from the batches finished before it.
+        """
+        submission_ids = []
+        total_uploaded = len(pdf_filepaths)
+        batch_count = 0
+        batches = self.batches(pdf_filepaths)
+        pending = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor, tqdm(
+            total=self._batch_total(pdf_filepaths)
+        ) as progress:
+            while True:
+                for pdf_batch in islice(batches, self.workers - len(pending)):
+                    future = executor.submit(self._upload_batch, pdf_batch, wait)
+                    pending[future] = pdf_batch
+                if not pending:
+                    break
+                done, _ = wait_for_futures(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pdf_batch = pending.pop(future)
+                    progress.update()
+                    try:
+                        batch_submission_ids, wait_error = future.result()
+                    except Exception as e:
+                        print(f"failed to upload {len(pdf_batch)} files: {e}")
+                        self.failed_files.extend(pdf_batch)
+                        continue
+                    submission_ids.append(batch_submission_ids)
+                    if wait_error is not None:
+                        print(
+                            f"uploaded {len(pdf_batch)} files but waiting for submissions "
+                            f"{batch_submission_ids} failed: {wait_error}"
+                        )
+                        self.wait_failed_ids.extend(batch_submission_ids)
+                    batch_count += len(pdf_batch)
+                    print(f"completed upload of {batch_count}/{total_uploaded}")
+        return submission_ids
+
+    def _upload_batch(self, pdf_batch, wait):
+        """
+        Return the submission ids of the batch and the error waiting for them
+        raised, or None, errors uploading the batch are raised
+        """
+        started = monotonic()
+        batch_submission_ids = self.indico_wrapper.upload_to_workflow(
+            self.workflow_id, pdf_batch
+        )
+        self._record_uploaded(pdf_batch, batch_submission_ids)
+        self._move_uploaded(pdf_batch)
+        if wait:
+            try:
+                self.indico_wrapper.wait_for_submission(
+                    batch_submission_ids, timeout=self.batch_timeout(pdf_batch)
+                )
+            except Exception as e:
+                return batch_submission_ids, e
+            self._observe(pdf_batch, monotonic() - started)
+        return batch_submission_ids, None
+
+    def batches(self, pdf_filepaths):
+        """
+        Yield the upload batches of pdf_filepaths. Without a target batch time
+        every batch has batch_size files, otherwise files are added to a batch
+        until its pages would take batch_seconds to process at the rate
+        learned so far, so later batches follow rate changes during the run
+        """
+        if self.processing_rate is None:
+            for batch_start in range(0, len(pdf_filepaths), self.batch_size):
+                yield pdf_filepaths[batch_start : batch_start + self.batch_size]
+            return
+
+        pdf_batch = []
+        batch_pages = 0
+        for pdf_filepath in pdf_filepaths:
+            pages = self._page_count(pdf_filepath)
+            if pdf_batch and (
+                self.processing_rate.expected_seconds(batch_pages + pages)
+                > self.batch_seconds
+            ):
+                yield pdf_batch
+                pdf_batch = []
+                batch_pages = 0
+            pdf_batch.append(pdf_filepath)
+            batch_pages += pages
+        if pdf_batch:
+            yield pdf_batch
+
+    def _progress(self, pdf_filepaths):
+        return tqdm(self.batches(pdf_filepaths), total=self._batch_total(pdf_filepaths))
+
+    def _batch_total(self, pdf_filepaths):
+        # adaptive batches are sized as they are uploaded
+        if self.processing_rate is None:
+            return -(-len(pdf_filepaths) // self.batch_size)
+        return None
+
+    def batch_timeout(self, pdf_batch):
+        """
+        Seconds to wait for a batch, TIMEOUT is used as the lower bound once
+        batches are sized adaptively
+        """
+        if self.processing_rate is None:
+            return self.timeout
+        pages = sum(self._page_count(pdf_filepath) for pdf_filepath in pdf_batch)
+        expected = self.processing_rate.expected_seconds(pages)
+        return max(self.timeout, TIMEOUT_SAFETY_FACTOR * expected)
+
+    def _page_count(self, pdf_filepath):
+        if pdf_filepath not in self.page_counts:
+            self.page_counts[pdf_filepath] = pdf_page_count(pdf_filepath)
+        return self.page_counts[pdf_filepath]
+
+    def _observe(self, pdf_batch, seconds):
+        if self.processing_rate is None:
+            return
+        pages = sum(self._page_count(pdf_filepath) for pdf_filepath in pdf_batch)
+        self.processing_rate.observe(pages, seconds)
+
+    def skip_duplicates(self, pdf_filepaths):
+        """
+        Hash pdf_filepaths and link the files already in the upload ledger to
+        their submission. Returns the files to upload, one per distinct
+        content, and the other copies found in this scan which are linked once
+        the first copy is uploaded
+        """
+        if self.upload_ledger is None:
+            return pdf_filepaths, []
+
+        self.file_hashes.update(hash_files(pdf_filepaths))
+        uploaded = self.upload_ledger.submission_ids(
+            self.file_hashes[pdf_filepath] for pdf_filepath in pdf_filepaths
+        )
+        to_upload = []
+        known_duplicates = []
+        pending_duplicates = []
+        seen_hashes = set()
+        for pdf_filepath in pdf_filepaths:
+            sha256 = self.file_hashes[pdf_filepath]
+            if sha256 in uploaded:
+                known_duplicates.append(pdf_filepath)
+            elif sha256 in seen_hashes:
+                pending_duplicates.append(pdf_filepath)
+            else:
+                seen_hashes.add(sha256)
+                to_upload.append(pdf_filepath)
+        self._link_duplicates(known_duplicates)
+        return to_upload, pending_duplicates
+
+    def _link_duplicates(self, pdf_filepaths):
+        """
+        Record each file whose content is in the upload ledger as a duplicate
+        of that submission and move it to uploaded_dir. Files whose content
+        never made it into the ledger stay where they are
+        """
+        if self.upload_ledger is None or not pdf_filepaths:
+            return
+        uploaded = self.upload_ledger.submission_ids(
+            self.file_hashes[pdf_filepath] for pdf_filepath in pdf_filepaths
+        )
+        linked = [
+            pdf_filepath
+            for pdf_filepath in pdf_filepaths
+            if self.file_hashes[pdf_filepath] in uploaded
+        ]
+        duplicates = []
+        for pdf_filepath in linked:
+            sha256 = self.file_hashes[pdf_filepath]
+            duplicates.append((sha256, uploaded[sha256], os.path.basename(pdf_filepath)))
+            print(
+                f"skipping {pdf_filepath}, it is a copy of submission {uploaded[sha256]}"
+            )
+        self.upload_ledger.record_duplicates(duplicates)
+        for pdf_filepath in linked:
+            self.submitted_files[pdf_filepath] = uploaded[self.file_hashes[pdf_filepath]]
+            move_file(pdf_filepath, self.uploaded_dir)
+        self.duplicate_files += len(linked)
+
+    def _record_uploaded(self, pdf_batch, batch_submission_ids):
+        # called as soon as the submissions exist, before moving or waiting,
+        # a file left behind by a crash or a failed wait is then linked as a
+        # duplicate on the next run rather than uploaded twice
+        with self._stats_lock:
+            self.submitted_files.update(zip(pdf_batch, batch_submission_ids))
+        if self.upload_ledger is None:
+            return
+        self.upload_ledger.record_uploads(
+            [
+                (
+                    self.file_hashes[pdf_filepath],
+                    submission_id,
+                    os.path.basename(pdf_filepath),
+                )
+                for pdf_filepath, submission_id in zip(pdf_batch, batch_submission_ids)
+            ]
+        )
+
+    def _move_uploaded(self, pdf_batch):
+        batch_bytes = sum(os.path.getsize(pdf_filepath) for pdf_filepath in pdf_batch)
+        for pdf_filepath in pdf_batch:
+            move_file(pdf_filepath, self.uploaded_dir)
+        with self._stats_lock:
+            self.uploaded_files += len(pdf_batch)
+            self.uploaded_bytes += batch_bytes
+
+    def throughput_summary(self, elapsed):
+        megabytes = self.uploaded_bytes / 1024 ** 2
+        elapsed = max(elapsed, 1e-9)
+        return (
+            f"uploaded {self.uploaded_files} files ({megabytes:.1f} MB) in "
+            f"{elapsed:.1f}s: {self.uploaded_files / elapsed:.2f} files/s, "
+            f"{megabytes / elapsed:.2f} MB/s"
+        )
+
 
 if __name__ == "__main__":
     if len(sys.argv) != 2:
@@ -61,6 +421,23 @@ if __name__ == "__main__":
     config = ExportConfiguration.from_yaml(configuration_path)
     workflow_upload = WorkflowUpload(config)
     pdf_filepaths = files_from_directory(config.document_input_dir, "*.pdf")
+    upload_start = monotonic()
     submision_ids = workflow_upload.upload_to_workflow(pdf_filepaths, wait=config.wait)
     print("Files have been submitted to workflow")
     print("Files have been moved to UPLOADED_DIR")
+    print(workflow_upload.throughput_summary(monotonic() - upload_start))
+    if workflow_upload.duplicate_files:
+        print(
+            f"{workflow_upload.duplicate_files} duplicate files were linked to "
+            "existing submissions instead of being uploaded"
+        )
+    if workflow_upload.failed_files:
+        print(
+            f"{len(workflow_upload.failed_files)} files failed to upload and were "
+            "left in DOCUMENT_INPUT_DIR, re-run the script to upload them"
+        )
+    if workflow_upload.wait_failed_ids:
+        print(
+            f"{len(workflow_upload.wait_failed_ids)} submissions were created but did "
+            f"not finish processing in time: {workflow_upload.wait_failed_ids}"
+        )
@@ -13,7 +13,7 @@ import pandas as pd
 
 from solutions_toolkit.uipath_block_scripts.utils import files_from_directory, move_file
 from solutions_toolkit.uipath_block_scripts.config import ExportConfiguration
-from solutions_toolkit.indico_wrapper import IndicoWrapper
+from solutions_toolkit.indico_wrapper import IndicoWrapper, RateLimiter
 
 
 USAGE_STRING = "USAGE: python3 workflow_upload.py path/to/config.yaml"
@@ -25,7 +25,11 @@ class WorkflowUpload:
         self.workflow_id = config.workflow_id
         self.uploaded_dir = config.uploaded_dir
         self.timeout = config.timeout
-        self.indico_wrapper = IndicoWrapper(config.host, config.api_token_path)
+        self.indico_wrapper = IndicoWrapper(
+            config.host,
+            config.api_token_path,
+            rate_limiter=RateLimiter.from_config(config),
+        )
 
     def upload_to_workflow(self, pdf_filepaths, wait=False):
         submission_ids = []
@@ -52,12 +56,10 @@ class WorkflowUpload:
 
     def submissions_csv(self,submision_ids):
         submissions_list=[]
-        submission_obj=[]
         for sub in submision_ids:
             for sub2 in sub:
                 submissions_list.append(sub2)
-        for sub in submissions_list:
-            submission_obj.append(self.indico_wrapper.get_submission(sub))
+        submission_obj = self.indico_wrapper.get_submissions_by_ids(submissions_list)
         sub_id = []
         sub_filename = []
         sub_status=[]
@@ -13,7 +13,7 @@ import pandas as pd
 import datetime
 from solutions_toolkit.uipath_block_scripts.utils import files_from_directory, move_file
 from solutions_toolkit.uipath_block_scripts.config import ExportConfiguration
-from solutions_toolkit.indico_wrapper import IndicoWrapper
+from solutions_toolkit.indico_wrapper import IndicoWrapper, RateLimiter
 
 
 USAGE_STRING = "USAGE: python3 workflow_upload.py path/to/config.yaml"
@@ -25,7 +25,11 @@ class WorkflowUpload:
         self.uploaded_dir = config.uploaded_dir
         self.submissions_df=pd.read_csv(config.submissions_csv)
         self.timeout = config.timeout
-        self.indico_wrapper = IndicoWrapper(config.host, config.api_token_path)
+        self.indico_wrapper = IndicoWrapper(
+            config.host,
+            config.api_token_path,
+            rate_limiter=RateLimiter.from_config(config),
+        )
 
     def upload_to_workflow(self,submision_ids, wait=True):
         total_uploaded = len(submision_ids)
@@ -49,9 +53,7 @@ class WorkflowUpload:
         submissions = []
         for sub in subs:
             submissions.append(sub)
-        submission_obj = []
-        for sub in submissions:
-            submission_obj.append(self.indico_wrapper.get_submission(sub))
+        submission_obj = self.indico_wrapper.get_submissions_by_ids(submissions)
         sub_id = []
         sub_filename = []
         sub_status=[]
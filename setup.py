@@ -21,9 +21,19 @@ setup(
     classifiers=[
         "License :: OSI Approved :: MIT License",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.7",
+        "Programming Language :: Python :: 3.9",
     ],
     packages=find_packages(exclude=("tests",)),
     include_package_data=True,
-    install_requires=["indico-client>=4.9", "PyYAML", "tqdm"],
+    python_requires=">=3.9",
+    install_requires=[
+        # AsyncIndicoClient, paged ListSubmissions with order_by and the
+        # updated_at submission filter
+        "indico-client>=7.10",
+        "aiohttp>=3.8",
+        "numpy",
+        "pandas",
+        "PyYAML",
+        "tqdm",
+    ],
 )
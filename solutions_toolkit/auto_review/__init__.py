@@ -1,4 +1,4 @@
 from solutions_toolkit.auto_review.config import AutoReviewConfiguration
 from solutions_toolkit.auto_review.field_config import FieldConfiguration
 from solutions_toolkit.auto_review.reviewer import Reviewer
-
+from solutions_toolkit.auto_review.review_plan import ReviewPlan
@@ -1,36 +1,196 @@
+import sys
+import os
+import logging
+from concurrent.futures import (
+    ThreadPoolExecutor,
+    ProcessPoolExecutor,
+    wait,
+    FIRST_COMPLETED,
+)
+
 from solutions_toolkit.auto_review.config import AutoReviewConfiguration
 from solutions_toolkit.auto_review.reviewer import Reviewer
-from solutions_toolkit.auto_review.field_config import FIELD_CONFIG
-from solutions_toolkit.indico_wrapper import IndicoWrapper
+from solutions_toolkit.auto_review.field_config import FieldConfiguration
+from solutions_toolkit.uipath_block_scripts.ledger import SubmissionLedger
+from solutions_toolkit.indico_wrapper import (
+    IndicoWrapper,
+    RateLimiter,
+    SubmissionCursor,
+)
 
 
+USAGE_STRING = "USAGE: python3 -m solutions_toolkit.auto_review.auto_review path/to/config.yaml"
 EXCEPTION_STATUS = "PENDING_ADMIN_REVIEW"
 AUTO_REVIEW_STATUS = "PENDING_AUTO_REVIEW"
 PENDING_REVIEW_STATUS = "PENDING_REVIEW"
 COMPLETE_STATUS = "COMPLETE"
 
+# ledger statuses, a review is recorded as submitting before the call and as
+# submitted once the platform accepted it
+REVIEW_SUBMITTING = "review_submitting"
+REVIEW_SUBMITTED = "review_submitted"
 
-if __name__ == "__main__":
+# outcomes of reviewing a submission, counted by AutoReviewRunner.run
+SUBMITTED = "submitted"
+ALREADY_SUBMITTED = "already submitted"
+SKIPPED = "skipped"
+FAILED = "failed"
 
-    # TODO: make this an input arg
-    configuration_file = "/home/fitz/Documents/customers/cushman-wakefield/invoices/cw_invoices_scripts/solutions_toolkit/auto_review/config.yaml"
-    config = AutoReviewConfiguration.from_yaml(configuration_file)
 
-    indico_wrapper = IndicoWrapper(config.host, config.api_token_path)
+def review_predictions(predictions, model_name, review_plan):
+    """
+    Run the review plan over one submission's predictions, module level so
+    it can run in a worker process
+    """
+    reviewer = Reviewer(predictions, model_name, review_plan)
+    reviewer.apply_reviews()
+    return reviewer.get_updated_predictions()
 
-    auto_review_submissions = indico_wrapper.get_submissions(
-        config.workflow_id, AUTO_REVIEW_STATUS, retrieved_flag=False
-    )
 
-    for submission in auto_review_submissions:
-        results = indico_wrapper.get_workflow_output(submission)
+class AutoReviewRunner:
+    """
+    Auto review submissions with a pool of threads fetching results and
+    submitting reviews, while the reviews themselves run in a process pool
+
+    Every submission is checked against the ledger and its current status
+    right before its review is submitted, so re-running after a crash never
+    submits a review twice: a review recorded as submitting is only sent again
+    if the submission is still waiting for auto review.
+    """
+
+    def __init__(
+        self,
+        indico_wrapper,
+        model_name,
+        review_plan,
+        ledger,
+        workers=4,
+        review_processes=None,
+    ):
+        self.indico_wrapper = indico_wrapper
+        self.model_name = model_name
+        self.review_plan = review_plan
+        self.ledger = ledger
+        self.workers = workers
+        self.review_processes = review_processes
+        self.outcomes = {}
 
+    def run(self, submissions, on_done=None):
+        """
+        Auto review the submissions of an iterable, calling on_done with each
+        submission once it is handled. Returns {outcome: count}, counting
+        FAILED for the submissions whose review raised
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as io_pool, ProcessPoolExecutor(
+            max_workers=self.review_processes
+        ) as review_pool:
+            in_flight = {}
+            for submission in submissions:
+                if len(in_flight) >= 2 * self.workers:
+                    self._collect(in_flight, on_done, FIRST_COMPLETED)
+                future = io_pool.submit(self.review_submission, submission, review_pool)
+                in_flight[future] = submission
+            self._collect(in_flight, on_done)
+        return self.outcomes
+
+    def review_submission(self, submission, review_pool):
+        """
+        Fetch, review and submit one submission, returning SUBMITTED,
+        ALREADY_SUBMITTED or SKIPPED
+        """
+        if self.ledger.has(submission.id, REVIEW_SUBMITTED):
+            return ALREADY_SUBMITTED
+
+        # a submission still waiting for auto review is reviewed again, even
+        # if an earlier attempt left a partial auto review on it
+        current = self.indico_wrapper.get_submission(submission.id)
+        if current.status != AUTO_REVIEW_STATUS:
+            if self.ledger.has(submission.id, REVIEW_SUBMITTING):
+                # a previous run was stopped after the platform took the review
+                self.ledger.record(submission.id, REVIEW_SUBMITTED)
+                return ALREADY_SUBMITTED
+            logging.info(
+                f"Skipping {submission.input_filename} : {submission.id}, "
+                f"status is {current.status}"
+            )
+            return SKIPPED
+
+        results = self.indico_wrapper.get_workflow_output(submission)
         inital_predictions = results["results"]["document"]["results"]
-        reviewer = Reviewer(inital_predictions, config.model_name, FIELD_CONFIG)
-        reviewer.apply_reviews()
-        updated_predictions = reviewer.get_updated_predictions()
+        updated_predictions = review_pool.submit(
+            review_predictions, inital_predictions, self.model_name, self.review_plan
+        ).result()
 
+        self.ledger.record(submission.id, REVIEW_SUBMITTING)
         # Note: this is a breaking call because we update the storage object
         # need to be careful with handling this
-        job = indico_wrapper.submit_updated_review(submission, updated_predictions)
-    print("Auto Review has been applied")
\ No newline at end of file
+        self.indico_wrapper.submit_updated_review(submission, updated_predictions)
+        self.ledger.record(submission.id, REVIEW_SUBMITTED)
+        return SUBMITTED
+
+    def _collect(self, in_flight, on_done, return_when="ALL_COMPLETED"):
+        done, _ = wait(in_flight, return_when=return_when)
+        for future in done:
+            submission = in_flight.pop(future)
+            try:
+                outcome = future.result()
+            except Exception as e:
+                outcome = FAILED
+                logging.error(
+                    f"Auto review of {submission.input_filename} : {submission.id} failed: {e}"
+                )
+            else:
+                logging.info(
+                    f"Auto review of {submission.input_filename} : {submission.id}: {outcome}"
+                )
+                if on_done is not None:
+                    on_done(submission)
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(USAGE_STRING)
+        sys.exit()
+
+    configuration_file = sys.argv[1]
+    if not os.path.exists(configuration_file):
+        print(f"configuration file: {configuration_file} does not exist")
+        sys.exit()
+    config = AutoReviewConfiguration.from_yaml(configuration_file)
+    review_plan = FieldConfiguration.from_yaml(config.field_config_file).review_plan
+
+    logging.basicConfig(
+        format="%(asctime)s %(levelname)s %(message)s", level=logging.INFO
+    )
+    indico_wrapper = IndicoWrapper(
+        config.host,
+        config.api_token_path,
+        rate_limiter=RateLimiter.from_config(config),
+    )
+
+    # submissions are fetched a page at a time as they are reviewed and, with
+    # a cursor file, only the ones updated since the last run
+    cursor = SubmissionCursor(config.submission_cursor_file)
+    auto_review_submissions = indico_wrapper.iter_submissions(
+        config.workflow_id, AUTO_REVIEW_STATUS, retrieved_flag=False, cursor=cursor
+    )
+
+    runner = AutoReviewRunner(
+        indico_wrapper,
+        config.model_name,
+        review_plan,
+        SubmissionLedger(config.ledger_file),
+        workers=config.workers,
+        review_processes=config.review_processes,
+    )
+    outcomes = runner.run(
+        auto_review_submissions,
+        on_done=lambda submission: cursor.advance(
+            config.workflow_id, AUTO_REVIEW_STATUS, submission
+        ),
+    )
+    # a failed submission keeps its status, the cursor must not move past it
+    if not outcomes.get(FAILED):
+        cursor.save()
+    print(f"Auto Review has been applied: {outcomes}")
@@ -1,6 +1,10 @@
 import re
 ACCEPTED = "accepted"
 REJECTED = "rejected"
+# marks that no text was found, None can be a predicted text
+NO_TEXT = object()
+BACKUP_DATE_REGEX = re.compile(r"^(?P<month>\d)[.\/1i](?P<day>\d{1,2})[.\/1i](?P<year>\d\d\d\d)$")
+DATE_REGEX = re.compile(r"^(?P<month>\d{1,2})[.\/1i](?P<day>\d{1,2})[.\/1i](?P<year>\d\d\d\d)$")
 
 def reject_by_confidence(prediction, label="asdf", conf_threshold=0.50):
     if prediction.get(REJECTED):
@@ -25,23 +29,25 @@ def accept_by_confidence(prediction, label="asdf", conf_threshold=0.98):
 
 
 def accept_all_by_confidence(predictions, label="asdf", conf_threshold=0.98):
-    pred_values = set()
-    
+    # a single pass finds the one confident text, and the texts with a low
+    # confidence prediction that would block accepting it
+    accepted_text = NO_TEXT
+    low_confidence_texts = set()
     for pred in predictions:
-        if pred.get(REJECTED) is None:                  
-            if pred["confidence"][label] > conf_threshold:
-                pred_values.add(pred["text"])
-                           
-    if len(pred_values) == 1:
-        text = pred_values.pop()
-        for pred in predictions:
-            if pred["text"] == text:
-                if not pred["confidence"][label] > conf_threshold:
+        if pred["confidence"][label] > conf_threshold:
+            if pred.get(REJECTED) is None:
+                if accepted_text is NO_TEXT:
+                    accepted_text = pred["text"]
+                elif pred["text"] != accepted_text:
                     return predictions
+        else:
+            low_confidence_texts.add(pred["text"])
 
-        for pred in predictions:
-            if pred["text"] == text:
-                pred[ACCEPTED] = True
+    if accepted_text is NO_TEXT or accepted_text in low_confidence_texts:
+        return predictions
+    for pred in predictions:
+        if pred["text"] == accepted_text:
+            pred[ACCEPTED] = True
     return predictions
 
 
@@ -56,44 +62,43 @@ def reject_by_max_character_length(prediction, max_length_threshold=10):
     return prediction
 
 def split_merged_values(predictions, split_filter=None):
+    # the split predictions share the merged prediction's confidence dict
     updated_predictions = []
+    append = updated_predictions.append
+    separator = split_filter or None
     for pred in predictions:
-        merged_text = pred["text"]
-        start = pred["start"]
-        if split_filter:
-            split_text = merged_text.split(split_filter)
-        else:
-            split_text = merged_text.split()
-        if len(split_text) == 1 or pred.get("rejected"):
-            updated_predictions.append(pred)
+        if pred.get(REJECTED):
+            append(pred)
+            continue
+        split_text = pred["text"].split(separator)
+        if len(split_text) == 1:
+            append(pred)
             continue
 
-        current_start = start
+        label = pred["label"]
+        confidence = pred["confidence"]
+        current_start = pred["start"]
         for text in split_text:
-            str_len = len(text)
-            if str_len == 0:
+            if not text:
                 current_start += 1
                 continue
-
-            split_value_start = current_start
-            split_value_end = split_value_start + str_len
+            split_value_end = current_start + len(text)
+            append(
+                {
+                    "text": text,
+                    "start": current_start,
+                    "end": split_value_end,
+                    "label": label,
+                    "confidence": confidence,
+                }
+            )
             current_start = split_value_end + 1
-            split_val_pred_dict = {
-                "text": text,
-                "start": split_value_start,
-                "end": split_value_end,
-                "label": pred["label"],
-                "confidence": pred["confidence"],
-            }
-            updated_predictions.append(split_val_pred_dict)
     return updated_predictions
 
 def fix_dates(date):
-    backup_regex = r"^(?P<month>\d)[.\/1i](?P<day>\d{1,2})[.\/1i](?P<year>\d\d\d\d)$"
-    main_regex = r"^(?P<month>\d{1,2})[.\/1i](?P<day>\d{1,2})[.\/1i](?P<year>\d\d\d\d)$"
-    date_match = re.search(main_regex, date)
+    date_match = DATE_REGEX.search(date)
     if date_match:
-        backup_match = re.search(backup_regex, date)
+        backup_match = BACKUP_DATE_REGEX.search(date)
         # backup match matches something but it's not the same as main match it's because it's something ambiguous like 1111/2020
         if backup_match is None or (backup_match.group("month") == date_match.group("month") and backup_match.group("day") == date_match.group("day")):
             year = date_match.group('year')
@@ -8,3 +8,12 @@ class AutoReviewConfiguration(Configuration):
         self.api_token_path = config.get("api_token_path")
         self.workflow_id = config.get("workflow_id")
         self.model_name = config.get("model_name")
+        self.rate_limit_per_second = config.get("rate_limit_per_second")
+        self.rate_limit_burst = config.get("rate_limit_burst")
+        self.max_in_flight = config.get("max_in_flight")
+        self.rate_limit_state_file = config.get("rate_limit_state_file")
+        self.submission_cursor_file = config.get("submission_cursor_file")
+        self.field_config_file = config.get("field_config_file")
+        self.workers = config.get("workers") or 4
+        self.review_processes = config.get("review_processes")
+        self.ledger_file = config.get("ledger_file") or "auto_review_ledger.jsonl"
@@ -1,4 +1,5 @@
 from solutions_toolkit.configuration import Configuration
+from solutions_toolkit.auto_review.review_plan import ReviewPlan
 
 FIELD_CONFIG = "FIELD_CONFIG"
 
@@ -9,3 +10,5 @@ class FieldConfiguration(Configuration):
         self.field_config = {}
         for class_name, function_configs in config[FIELD_CONFIG].items():
             self.field_config[class_name] = function_configs
+        # raises ValueError for unknown functions or bad kwargs
+        self.review_plan = ReviewPlan.compile(self.field_config)
@@ -0,0 +1,104 @@
+import inspect
+from functools import partial
+from collections import namedtuple
+
+from solutions_toolkit.auto_review.auto_review_functions import (
+    accept_by_confidence,
+    reject_by_confidence,
+    reject_by_min_character_length,
+    reject_by_max_character_length,
+    accept_all_by_confidence,
+    split_merged_values,
+    remove_by_confidence,
+    review_issue_dates,
+    fix_amounts,
+)
+
+
+REVIEWERS = {
+    "accept_by_confidence": accept_by_confidence,
+    "reject_by_confidence": reject_by_confidence,
+    "reject_by_min_character_length": reject_by_min_character_length,
+    "reject_by_max_character_length": reject_by_max_character_length,
+    "accept_all_by_confidence": accept_all_by_confidence,
+    "split_merged_values": split_merged_values,
+    "remove_by_confidence": remove_by_confidence,
+    "review_issue_dates": review_issue_dates,
+    "fix_amounts": fix_amounts
+}
+
+SINGLE = "single"
+ALL = "all"
+PREDICTION_SETS = (SINGLE, ALL)
+
+
+class ReviewStep(namedtuple("ReviewStep", ["function_name", "review_fn", "prediction_set"])):
+    """
+    One review function with its kwargs already bound
+    """
+
+    __slots__ = ()
+
+    def apply(self, predictions):
+        if self.prediction_set == SINGLE:
+            return [self.review_fn(pred) for pred in predictions]
+        return self.review_fn(predictions)
+
+
+class ReviewPlan:
+    """
+    A field config compiled once into the review steps to run per label
+
+    Function names are resolved against REVIEWERS and the kwargs are checked
+    against the function's signature when the plan is compiled, so a bad
+    field config fails with a ValueError at load time instead of on the first
+    document. A plan holds no per document state and can be shared by any
+    number of Reviewers, threads or processes.
+    """
+
+    def __init__(self, steps):
+        # ((label, (ReviewStep, ...)), ...) in field config order
+        self._steps = tuple((label, tuple(label_steps)) for label, label_steps in steps)
+
+    @classmethod
+    def compile(cls, field_config):
+        steps = []
+        for label, fn_configs in field_config.items():
+            if not isinstance(fn_configs, list):
+                raise ValueError(
+                    f"field config for {label} must be a list of functions, "
+                    "check the hyphen before each function"
+                )
+            steps.append(
+                (label, [cls._compile_step(label, fn_config) for fn_config in fn_configs])
+            )
+        return cls(steps)
+
+    @staticmethod
+    def _compile_step(label, fn_config):
+        fn_name = fn_config.get("function")
+        if fn_name not in REVIEWERS:
+            raise ValueError(
+                f"unknown review function {fn_name} for {label}, "
+                f"expected one of {sorted(REVIEWERS)}"
+            )
+        prediction_set = fn_config.get("prediction_set")
+        if prediction_set not in PREDICTION_SETS:
+            raise ValueError(
+                f"prediction_set of {fn_name} for {label} is {prediction_set}, "
+                f"expected one of {PREDICTION_SETS}"
+            )
+        review_fn = REVIEWERS[fn_name]
+        kwargs = fn_config.get("kwargs") or {}
+        try:
+            # the first argument is the prediction or list of predictions
+            inspect.signature(review_fn).bind(None, **kwargs)
+        except TypeError as e:
+            raise ValueError(f"invalid kwargs for {fn_name} for {label}: {e}") from e
+        return ReviewStep(fn_name, partial(review_fn, **kwargs), prediction_set)
+
+    def __iter__(self):
+        return iter(self._steps)
+
+    def __len__(self):
+        return len(self._steps)
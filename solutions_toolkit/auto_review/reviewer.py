@@ -1,34 +1,18 @@
 from collections import defaultdict
 
-from solutions_toolkit.auto_review.auto_review_functions import (
-    accept_by_confidence,
-    reject_by_confidence,
-    reject_by_min_character_length,
-    reject_by_max_character_length,
-    accept_all_by_confidence,
-    split_merged_values,
-    remove_by_confidence,
-    review_issue_dates,
-    fix_amounts,
-)
-
-
-REVIEWERS = {
-    "accept_by_confidence": accept_by_confidence,
-    "reject_by_confidence": reject_by_confidence,
-    "reject_by_min_character_length": reject_by_min_character_length,
-    "reject_by_max_character_length": reject_by_max_character_length,
-    "accept_all_by_confidence": accept_all_by_confidence,
-    "split_merged_values": split_merged_values,
-    "remove_by_confidence": remove_by_confidence,
-    "review_issue_dates": review_issue_dates,
-    "fix_amounts": fix_amounts
-}
+# REVIEWERS moved to review_plan.py, it is still importable from here
+from solutions_toolkit.auto_review.review_plan import REVIEWERS, ReviewPlan  # noqa: F401
 
 
 class Reviewer:
     def __init__(self, predictions, model_name, review_config):
-        self.review_config = review_config
+        """
+        review_config is a compiled ReviewPlan, or a field config dict which
+        is compiled on every call so prefer passing a plan
+        """
+        if not isinstance(review_config, ReviewPlan):
+            review_config = ReviewPlan.compile(review_config)
+        self.review_plan = review_config
         self.model_name = model_name
         self.predictions = predictions[self.model_name]
         self.prediction_label_map = self.format_pred_label_map()
@@ -41,22 +25,11 @@ class Reviewer:
         return prediction_label_map
 
     def apply_reviews(self):
-        for label, fn_configs in self.review_config.items():
-            for fn_config in fn_configs:
-                fn_name = fn_config["function"]
-                review_fn = REVIEWERS[fn_name]
-                kwargs = fn_config["kwargs"] if fn_config["kwargs"] else {}
-                if fn_config["prediction_set"] == "single":
-                    updated_predictions = []
-                    for pred in self.prediction_label_map[label]:
-                        updated_pred = review_fn(pred, **kwargs)
-                        updated_predictions.append(updated_pred)
-                    self.prediction_label_map[label] = updated_predictions
-                elif fn_config["prediction_set"] == "all":
-                    updated_predictions = review_fn(
-                        self.prediction_label_map[label], **kwargs
-                    )
-                    self.prediction_label_map[label] = updated_predictions
+        for label, steps in self.review_plan:
+            for step in steps:
+                self.prediction_label_map[label] = step.apply(
+                    self.prediction_label_map[label]
+                )
 
     def get_updated_predictions(self):
         updated_predictions = defaultdict(list)
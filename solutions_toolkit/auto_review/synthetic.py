@@ -0,0 +1,117 @@
+"""
+Seeded generator of prediction payloads shaped like workflow results, for
+benchmarking review plans without a platform
+"""
+import random
+
+# text generators picked by keywords in the class name, the first match wins
+TEXT_KINDS = [
+    ("date", "date"),
+    ("amount", "amount"),
+    ("balance", "amount"),
+    ("number", "number"),
+    ("#", "number"),
+    ("zip", "number"),
+    ("currency", "currency"),
+    ("state", "state"),
+]
+WORDS = ["Acme", "Holdings", "Property", "Management", "North", "Plaza", "Trust", "LLC", "Inc"]
+STATES = ["NY", "CA", "TX", "IL", "Ill", "N.Y."]
+CURRENCIES = ["USD", "EUR", "CAD", "$"]
+# chance a value is several values the model merged into one span
+MERGED_RATE = 0.15
+# chance a prediction comes from OCR noise and is one or two characters
+NOISE_RATE = 0.05
+
+
+def text_kind(label):
+    lowered = label.lower()
+    for keyword, kind in TEXT_KINDS:
+        if keyword in lowered:
+            return kind
+    return "words"
+
+
+def synthetic_value(kind, rng):
+    if kind == "date":
+        value = f"{rng.randint(1, 12)}{rng.choice('/.1')}{rng.randint(1, 28)}/{rng.randint(2015, 2022)}"
+    elif kind == "amount":
+        value = f"{rng.randint(0, 250000):,}.{rng.randint(0, 99):02d}"
+        if rng.random() < 0.1:
+            # european formatting, fix_amounts turns it around
+            value = value.replace(",", " ").replace(".", ",").replace(" ", ".")
+    elif kind == "number":
+        value = str(rng.randint(10, 10 ** rng.randint(3, 10)))
+    elif kind == "currency":
+        value = rng.choice(CURRENCIES)
+    elif kind == "state":
+        value = rng.choice(STATES)
+    else:
+        value = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+    return value
+
+
+def confidence_labels(field_config):
+    """
+    The class names plus every label a review function reads the confidence
+    of, these can differ from the class they are configured on
+    """
+    labels = dict.fromkeys(field_config)
+    for fn_configs in field_config.values():
+        for fn_config in fn_configs:
+            kwargs = fn_config.get("kwargs") or {}
+            if "label" in kwargs:
+                labels.setdefault(kwargs["label"])
+    return list(labels)
+
+
+def synthetic_predictions(field_config, n_predictions, rng):
+    """
+    n_predictions predictions for the classes of field_config, in document
+    order with a confidence for every label
+    """
+    labels = list(field_config)
+    all_labels = confidence_labels(field_config)
+    predictions = []
+    offset = 0
+    for _ in range(n_predictions):
+        label = rng.choice(labels)
+        kind = text_kind(label)
+        if rng.random() < NOISE_RATE:
+            text = rng.choice(["1", "l", "I.", "$", "--"])
+        elif rng.random() < MERGED_RATE:
+            text = " ".join(synthetic_value(kind, rng) for _ in range(rng.randint(2, 4)))
+        else:
+            text = synthetic_value(kind, rng)
+
+        # mostly confident predictions with a long tail, as models produce
+        confidence = {other: rng.random() * 0.3 for other in all_labels}
+        confidence[label] = min(1.0, rng.betavariate(8, 1))
+        start = offset + rng.randint(1, 40)
+        offset = start + len(text)
+        predictions.append(
+            {
+                "label": label,
+                "text": text,
+                "start": start,
+                "end": offset,
+                "confidence": confidence,
+            }
+        )
+    return predictions
+
+
+def synthetic_documents(field_config, n_docs, predictions_per_doc, model_name, seed=0):
+    """
+    n_docs {model_name: predictions} payloads, the number of predictions per
+    document varies around predictions_per_doc. The same seed gives the same
+    documents.
+    """
+    rng = random.Random(seed)
+    documents = []
+    for _ in range(n_docs):
+        n_predictions = max(1, int(rng.gauss(predictions_per_doc, predictions_per_doc / 4)))
+        documents.append(
+            {model_name: synthetic_predictions(field_config, n_predictions, rng)}
+        )
+    return documents
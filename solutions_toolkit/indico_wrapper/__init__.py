@@ -1 +1,5 @@
 from solutions_toolkit.indico_wrapper.indico_wrapper import IndicoWrapper
+from solutions_toolkit.indico_wrapper.storage_cache import StorageCache
+from solutions_toolkit.indico_wrapper.retry_policy import RetryPolicy, CircuitOpenError
+from solutions_toolkit.indico_wrapper.rate_limit import RateLimiter
+from solutions_toolkit.indico_wrapper.submission_cursor import SubmissionCursor
@@ -0,0 +1,145 @@
+import asyncio
+
+from indico.queries import (
+    RetrieveStorageObject,
+    SubmissionFilter,
+    ListSubmissions,
+    SubmitReview,
+    GetSubmission,
+    WorkflowSubmission,
+    WaitForSubmissions,
+    SubmissionResult,
+    UpdateSubmission,
+    GraphQLRequest,
+)
+from indico import AsyncIndicoClient, IndicoConfig
+from .decorators import async_retry_request
+
+# aiohttp's default connection pool size
+MAX_CONNECTIONS = 100
+
+
+class AsyncIndicoWrapper:
+    """
+    Coroutine version of IndicoWrapper
+
+    All calls share one AsyncIndicoClient, which holds a single keep-alive
+    aiohttp session, so callers can gather hundreds of requests without a
+    thread per request. max_connections bounds how many calls are in flight
+    at once. rate_limiter is an optional RateLimiter shared with other
+    wrappers, only its requests per second apply here.
+
+    Usage:
+        async with AsyncIndicoWrapper(host, api_token_path) as indico_wrapper:
+            results = await asyncio.gather(
+                *(indico_wrapper.get_submission_results(s) for s in submissions)
+            )
+    """
+
+    def __init__(
+        self, host, api_token_path, max_connections=MAX_CONNECTIONS, rate_limiter=None
+    ):
+        self.host = host
+        self.api_token_path = api_token_path
+        self.max_connections = max_connections
+        self.rate_limiter = rate_limiter
+
+        with open(api_token_path) as f:
+            self.api_token = f.read().strip()
+
+        self.indico_config = IndicoConfig(
+            host=self.host, api_token=self.api_token, verify_ssl=False
+        )
+        self.indico_client = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return await self.create()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def create(self):
+        """
+        Open the pooled session and authenticate, must run inside the event loop
+        """
+        self._semaphore = asyncio.Semaphore(self.max_connections)
+        self.indico_client = await AsyncIndicoClient(config=self.indico_config).create()
+        return self
+
+    async def close(self):
+        if self.indico_client is not None:
+            await self.indico_client.cleanup()
+            self.indico_client = None
+        self._semaphore = None
+
+    async def call(self, request):
+        if self._semaphore is None:
+            raise RuntimeError(
+                "AsyncIndicoWrapper is not open, await create() or use it with async with"
+            )
+        # the token is taken before a connection slot so calls waiting on the
+        # rate limit do not hold connections. reserve can block on the shared
+        # state file lock, so it runs off the event loop
+        if self.rate_limiter is not None:
+            loop = asyncio.get_running_loop()
+            await asyncio.sleep(
+                await loop.run_in_executor(None, self.rate_limiter.reserve)
+            )
+        async with self._semaphore:
+            return await self.indico_client.call(request)
+
+    @async_retry_request
+    async def get_submission(self, submission_id):
+        return await self.call(GetSubmission(submission_id))
+
+    @async_retry_request
+    async def get_submissions(
+        self, workflow_id, submission_status=None, retrieved_flag=None
+    ):
+        sub_filter = SubmissionFilter(
+            status=submission_status, retrieved=retrieved_flag
+        )
+        return await self.call(
+            ListSubmissions(workflow_ids=[workflow_id], filters=sub_filter)
+        )
+
+    @async_retry_request
+    async def get_workflow_output(self, submission):
+        return await self.call(RetrieveStorageObject(submission.result_file))
+
+    @async_retry_request
+    async def get_storage_object(self, storage_url):
+        return await self.call(RetrieveStorageObject(storage_url))
+
+    @async_retry_request
+    async def get_submission_results(self, submission):
+        sub_job = await self.call(SubmissionResult(submission.id, wait=True))
+        return await self.get_storage_object(sub_job.result)
+
+    async def submit_updated_review(self, submission, updated_predictions):
+        return await self.call(
+            SubmitReview(submission.id, changes=updated_predictions)
+        )
+
+    async def upload_to_workflow(self, workflow_id, pdf_filepaths):
+        """
+        Return a list of submission ids
+        """
+        return await self.call(
+            WorkflowSubmission(workflow_id=workflow_id, files=pdf_filepaths)
+        )
+
+    async def wait_for_submission(self, submission_ids, timeout=60):
+        return await self.call(
+            WaitForSubmissions(submission_ids=submission_ids, timeout=timeout)
+        )
+
+    @async_retry_request
+    async def mark_retreived(self, submission):
+        await self.call(UpdateSubmission(submission.id, retrieved=True))
+
+    async def graphQL_request(self, graphql_query, variables):
+        return await self.call(
+            GraphQLRequest(query=graphql_query, variables=variables)
+        )
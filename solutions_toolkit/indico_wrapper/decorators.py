@@ -1,3 +1,4 @@
+import asyncio
 from time import sleep
 from functools import wraps
 from indico import IndicoRequestError
@@ -12,7 +13,14 @@ def retry_request(func):
         note that retry_count, delay, and allowed exceptions are arguments that
         are meant to be user defined and should be passed to the function that
         is getting retried
+
+        if the decorated method belongs to an object with a retry_policy, the
+        policy handles backoff, the circuit breaker and the retry budget instead
         """
+        retry_policy = getattr(args[0], "retry_policy", None) if args else None
+        if retry_policy is not None:
+            return retry_policy.call(args[0].host, func, *args, **kwargs)
+
         retry_count = kwargs.get("retry_count", 5)
         delay = kwargs.get("delay", 30)
         allowed_exceptions = kwargs.get("allowed_exceptions", ALLOWED_EXCEPTIONS)
@@ -40,3 +48,36 @@ def retry_request(func):
                     sleep(delay)
 
     return wrapper_retry_request
+
+
+def async_retry_request(func):
+    @wraps(func)
+    async def wrapper_retry_request(*args, **kwargs):
+        """
+        coroutine version of retry_request, waiting between attempts does not
+        block the event loop
+        """
+        retry_count = kwargs.get("retry_count", 5)
+        delay = kwargs.get("delay", 30)
+        allowed_exceptions = kwargs.get("allowed_exceptions", ALLOWED_EXCEPTIONS)
+        for count in range(retry_count):
+            try:
+                return await func(*args, **kwargs)
+            except allowed_exceptions as e:
+                if count == retry_count - 1:
+                    print(
+                        "An exception has occurred on attempt {}. Please re-run the script at a later time.".format(
+                            count + 1
+                        )
+                    )
+                    raise (e)
+                else:
+                    print(e)
+                    print(
+                        "Attempt {} failed, retrying in {} seconds".format(
+                            count + 1, delay
+                        )
+                    )
+                    await asyncio.sleep(delay)
+
+    return wrapper_retry_request
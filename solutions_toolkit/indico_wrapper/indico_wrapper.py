@@ -1,3 +1,5 @@
+import logging
+
 from indico.queries import (
     RetrieveStorageObject,
     SubmissionFilter,
@@ -14,16 +16,43 @@ from indico.queries import (
     DownloadExport
 )
 from indico import IndicoClient, IndicoConfig
+from indico.filters import DateRangeFilter
 from .decorators import retry_request
 
+MARK_RETRIEVED_CHUNK_SIZE = 100
+# ListSubmissions returns at most 1000 submissions per call
+LIST_SUBMISSIONS_PAGE_SIZE = 1000
+# incremental listing walks submissions from the least recently updated
+LIST_SUBMISSIONS_ORDER = "UPDATED_AT"
+
+
 class IndicoWrapper:
     """
     Class to handle all indico api calls
+
+    storage_cache is an optional StorageCache, when set storage objects are
+    read from local disk before being downloaded from the platform
+
+    retry_policy is an optional RetryPolicy used by every retried method in
+    place of the fixed 30 second retry loop, share one policy between wrappers
+    so the circuit breakers and retry budget see all calls of the process
+
+    rate_limiter is an optional RateLimiter every platform call waits on
     """
 
-    def __init__(self, host, api_token_path):
+    def __init__(
+        self,
+        host,
+        api_token_path,
+        storage_cache=None,
+        retry_policy=None,
+        rate_limiter=None,
+    ):
         self.host = host
         self.api_token_path = api_token_path
+        self.storage_cache = storage_cache
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
 
         with open(api_token_path) as f:
             self.api_token = f.read().strip()
@@ -33,36 +62,143 @@ class IndicoWrapper:
         )
         self.indico_client = IndicoClient(config=my_config)
 
+    def call(self, request):
+        if self.rate_limiter is None:
+            return self.indico_client.call(request)
+        with self.rate_limiter.limit():
+            return self.indico_client.call(request)
+
     @retry_request
     def get_submission(self, submission_id):
-        return self.indico_client.call(GetSubmission(submission_id))
+        return self.call(GetSubmission(submission_id))
     
+    def get_submissions_by_ids(self, submission_ids, page_size=LIST_SUBMISSIONS_PAGE_SIZE):
+        """
+        Return the submissions for submission_ids in the same order, fetched
+        with one ListSubmissions call per page_size ids. Ids the platform does
+        not return, e.g. deleted submissions, are logged and left out
+        """
+        submission_ids = [int(submission_id) for submission_id in submission_ids]
+        submissions_by_id = {}
+        for page_start in range(0, len(submission_ids), page_size):
+            page_ids = submission_ids[page_start : page_start + page_size]
+            for submission in self._list_submissions_by_ids(page_ids):
+                submissions_by_id[submission.id] = submission
+        missing_ids = [
+            submission_id
+            for submission_id in submission_ids
+            if submission_id not in submissions_by_id
+        ]
+        if missing_ids:
+            logging.warning(
+                f"{len(missing_ids)} submissions were not found: {missing_ids}"
+            )
+        return [
+            submissions_by_id[submission_id]
+            for submission_id in submission_ids
+            if submission_id in submissions_by_id
+        ]
+
+    @retry_request
+    def _list_submissions_by_ids(self, submission_ids, sub_filter=None):
+        return self.call(
+            ListSubmissions(
+                submission_ids=submission_ids,
+                filters=sub_filter,
+                limit=len(submission_ids),
+                order_by=LIST_SUBMISSIONS_ORDER,
+                desc=False,
+            )
+        )
+
     @retry_request
     def get_submissions(self, workflow_id, submission_status=None, retrieved_flag=None):
         sub_filter = SubmissionFilter(
             status=submission_status, retrieved=retrieved_flag
         )
-        complete_submissions = self.indico_client.call(
+        complete_submissions = self.call(
             ListSubmissions(workflow_ids=[workflow_id], filters=sub_filter)
         )
         return complete_submissions
 
+    def iter_submissions(
+        self,
+        workflow_id,
+        submission_status=None,
+        retrieved_flag=None,
+        cursor=None,
+        page_size=LIST_SUBMISSIONS_PAGE_SIZE,
+    ):
+        """
+        Yield the submissions of a workflow page by page, oldest update first.
+        With a SubmissionCursor only submissions new or updated since the
+        cursor's high-water mark are listed, the caller advances the cursor
+        as it handles them
+
+        Pages are offsets into the filtered listing, which shrinks as callers
+        mark submissions retrieved or review them. So the listing is walked
+        for ids before the first submission is yielded, and the submissions
+        are then fetched by id one page at a time
+        """
+        updated_at = None
+        if cursor is not None:
+            since = cursor.since(workflow_id, submission_status)
+            if since is not None:
+                updated_at = DateRangeFilter(filter_from=since.isoformat())
+        sub_filter = SubmissionFilter(
+            status=submission_status, retrieved=retrieved_flag, updated_at=updated_at
+        )
+        request = ListSubmissions(
+            workflow_ids=[workflow_id],
+            filters=sub_filter,
+            limit=page_size,
+            order_by=LIST_SUBMISSIONS_ORDER,
+            desc=False,
+        )
+        submission_ids = []
+        while request.has_next_page:
+            for submission in self._next_page(request):
+                if cursor is None or cursor.is_new(
+                    workflow_id, submission_status, submission
+                ):
+                    submission_ids.append(submission.id)
+        for page_start in range(0, len(submission_ids), page_size):
+            page_ids = submission_ids[page_start : page_start + page_size]
+            # submissions that stopped matching the filters are left out
+            yield from self._list_submissions_by_ids(page_ids, sub_filter)
+
+    @retry_request
+    def _next_page(self, request):
+        # the request only moves its page cursor after a successful response,
+        # so a retry asks for the same page again
+        return self.call(request)
+
     @retry_request
     def get_workflow_output(self, submission):
-        return self.indico_client.call(RetrieveStorageObject(submission.result_file))
+        return self.call(RetrieveStorageObject(submission.result_file))
 
     @retry_request
-    def get_storage_object(self, storage_url):
-        return self.indico_client.call(RetrieveStorageObject(storage_url))
+    def get_storage_object(self, storage_url, cache=True):
+        """
+        cache=False always downloads the object, use it for storage objects
+        that can change such as submission results
+        """
+        if cache and self.storage_cache is not None:
+            return self.storage_cache.get_or_fetch(
+                storage_url,
+                lambda: self.call(RetrieveStorageObject(storage_url)),
+            )
+        return self.call(RetrieveStorageObject(storage_url))
 
     @retry_request
     def get_submission_results(self, submission):
-        sub_job = self.indico_client.call(SubmissionResult(submission.id, wait=True))
-        results = self.get_storage_object(sub_job.result)
+        sub_job = self.call(SubmissionResult(submission.id, wait=True))
+        # results are rewritten when a review is submitted so never cache them
+        results = self.get_storage_object(sub_job.result, cache=False)
         return results
 
     def submit_updated_review(self, submission, updated_predictions):
-        return self.indico_client.call(
+        return self.call(
             SubmitReview(submission.id, changes=updated_predictions)
         )
 
@@ -70,31 +206,73 @@ class IndicoWrapper:
         """
         Return a list of submission ids
         """
-        return self.indico_client.call(
+        return self.call(
             WorkflowSubmission(workflow_id=workflow_id, files=pdf_filepaths)
         )
 
     def wait_for_submission(self, submission_ids, timeout=60):
-        return self.indico_client.call(
+        return self.call(
             WaitForSubmissions(submission_ids=submission_ids, timeout=timeout)
         )
 
     @retry_request
     def mark_retreived(self, submission):
-        self.indico_client.call(UpdateSubmission(submission.id, retrieved=True))
+        self.call(UpdateSubmission(submission.id, retrieved=True))
+
+    def mark_retrieved_many(self, submission_ids, chunk_size=MARK_RETRIEVED_CHUNK_SIZE):
+        """
+        Mark submissions retrieved with one aliased updateSubmission mutation
+        per chunk of submission ids
+
+        Return a dict of {submission_id: exception} for the submissions that
+        could not be marked. A failed chunk is retried one submission at a
+        time to find out which ids failed.
+        """
+        failures = {}
+        submission_ids = [int(submission_id) for submission_id in submission_ids]
+        for chunk_start in range(0, len(submission_ids), chunk_size):
+            chunk = submission_ids[chunk_start : chunk_start + chunk_size]
+            try:
+                self._mark_retrieved_chunk(chunk)
+            except Exception:
+                for submission_id in chunk:
+                    try:
+                        self.call(
+                            UpdateSubmission(submission_id, retrieved=True)
+                        )
+                    except Exception as e:
+                        failures[submission_id] = e
+        return failures
+
+    def _mark_retrieved_chunk(self, submission_ids):
+        variable_defs = []
+        mutations = []
+        variables = {}
+        for i, submission_id in enumerate(submission_ids):
+            variable_defs.append(f"$id{i}: Int!")
+            mutations.append(
+                f"s{i}: updateSubmission(submissionId: $id{i}, retrieved: true) {{ id retrieved }}"
+            )
+            variables[f"id{i}"] = submission_id
+        query = "mutation MarkRetrieved({}) {{\n{}\n}}".format(
+            ", ".join(variable_defs), "\n".join(mutations)
+        )
+        return self.graphQL_request(query, variables)
 
     def graphQL_request(self, graphql_query, variables):
-        return self.indico_client.call(
+        return self.call(
             GraphQLRequest(query=graphql_query, variables=variables)
         )
 
+    @retry_request
     def get_dataset(self, dataset_id):
-        return self.indico_client.call(GetDataset(dataset_id))
+        return self.call(GetDataset(dataset_id))
 
     def create_export(self, dataset_id, **kwargs):
-        return self.indico_client.call(
+        return self.call(
             CreateExport(dataset_id=dataset_id, **kwargs)
         )
 
+    @retry_request
     def download_export(self, export_id):
-        return self.indico_wrapper.call(DownloadExport(export_id))
+        return self.call(DownloadExport(export_id))
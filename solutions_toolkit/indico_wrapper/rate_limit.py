@@ -0,0 +1,123 @@
+import os
+import json
+import threading
+from time import sleep, time
+from contextlib import contextmanager
+
+# a lock file older than this was left behind by a process that died
+STALE_LOCK_SECONDS = 10
+
+
+class RateLimiter:
+    """
+    Token bucket limiting requests per second, plus an optional cap on how
+    many requests are in flight at once
+
+    The bucket holds up to burst tokens and refills at rate tokens a second.
+    Every request takes a token straight away and then waits until the bucket
+    would have refilled it, so waiting callers are served in order.
+
+    With state_path set the bucket lives in a small json file guarded by a lock
+    file, so the upload, export and auto review jobs of one host share the
+    same budget. max_in_flight always applies to this process only.
+    """
+
+    def __init__(self, rate, burst=None, max_in_flight=None, state_path=None):
+        self.rate = float(rate)
+        self.burst = float(burst) if burst else max(1.0, self.rate)
+        self.state_path = state_path
+        self.lock_path = f"{state_path}.lock" if state_path else None
+        self._tokens = self.burst
+        self._updated = time()
+        self._lock = threading.Lock()
+        self._in_flight = (
+            threading.BoundedSemaphore(max_in_flight) if max_in_flight else None
+        )
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Return a limiter for the rate limit settings of config, or None when
+        no rate limit is configured
+        """
+        if not config.rate_limit_per_second:
+            return None
+        return cls(
+            config.rate_limit_per_second,
+            burst=config.rate_limit_burst,
+            max_in_flight=config.max_in_flight,
+            state_path=config.rate_limit_state_file,
+        )
+
+    @contextmanager
+    def limit(self):
+        """
+        Hold an in flight slot and wait for a token before the block runs
+        """
+        if self._in_flight is not None:
+            self._in_flight.acquire()
+        try:
+            sleep(self.reserve())
+            yield
+        finally:
+            if self._in_flight is not None:
+                self._in_flight.release()
+
+    def reserve(self):
+        """
+        Take a token and return how many seconds to wait before using it
+        """
+        with self._lock:
+            if self.state_path is None:
+                self._tokens, self._updated, wait = self._take(
+                    self._tokens, self._updated
+                )
+                return wait
+            with self._file_lock():
+                tokens, updated = self._read_state()
+                tokens, updated, wait = self._take(tokens, updated)
+                self._write_state(tokens, updated)
+                return wait
+
+    def _take(self, tokens, updated):
+        now = time()
+        tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+        tokens -= 1
+        wait = -tokens / self.rate if tokens < 0 else 0.0
+        return tokens, now, wait
+
+    def _read_state(self):
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            return state["tokens"], state["updated"]
+        except (OSError, ValueError, KeyError):
+            return self.burst, time()
+
+    def _write_state(self, tokens, updated):
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"tokens": tokens, "updated": updated}, f)
+        os.replace(tmp_path, self.state_path)
+
+    @contextmanager
+    def _file_lock(self):
+        # O_EXCL creation is atomic on every platform we run on, including
+        # Windows where fcntl is not available
+        while True:
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    if time() - os.path.getmtime(self.lock_path) > STALE_LOCK_SECONDS:
+                        os.remove(self.lock_path)
+                        continue
+                except OSError:
+                    continue
+                sleep(0.001)
+        try:
+            yield
+        finally:
+            os.close(fd)
+            os.remove(self.lock_path)
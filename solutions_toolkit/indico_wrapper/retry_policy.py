@@ -0,0 +1,191 @@
+import random
+import threading
+from time import sleep, monotonic
+from collections import deque
+
+from .decorators import ALLOWED_EXCEPTIONS
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling the platform while a host's circuit is open
+    """
+
+
+class RetryBudget:
+    """
+    Retries shared by every call using the same policy
+
+    Each retry spends one token and each successful call earns token_ratio
+    tokens back, so when most calls are failing the budget drains and calls
+    stop retrying instead of multiplying load on the platform.
+    """
+
+    def __init__(self, max_tokens=20, token_ratio=0.1):
+        self.max_tokens = max_tokens
+        self.token_ratio = token_ratio
+        self.tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def try_spend(self):
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.token_ratio)
+
+
+class CircuitBreaker:
+    """
+    Fails fast when the error rate of recent calls to a host spikes
+
+    The circuit opens once at least min_calls of the last window calls were
+    made and error_rate of them failed. While open every call fails with
+    CircuitOpenError, after reset_timeout seconds one trial call is let
+    through and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, error_rate=0.5, window=20, min_calls=10, reset_timeout=60):
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.outcomes = deque(maxlen=window)
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._trial_running or monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self._trial_running = True
+            return True
+
+    def record(self, success):
+        with self._lock:
+            if self._trial_running:
+                self._trial_running = False
+                self.outcomes.clear()
+                self.opened_at = None if success else monotonic()
+                return
+
+            self.outcomes.append(success)
+            failures = self.outcomes.count(False)
+            if (
+                len(self.outcomes) >= self.min_calls
+                and failures / len(self.outcomes) >= self.error_rate
+            ):
+                self.opened_at = monotonic()
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter, a circuit breaker per host and a
+    retry budget shared by all concurrent calls
+
+    One policy is meant to be shared by every IndicoWrapper of a process, see
+    retry_request for how wrapper methods use it.
+    """
+
+    def __init__(
+        self,
+        max_attempts=5,
+        base_delay=1,
+        max_delay=60,
+        allowed_exceptions=ALLOWED_EXCEPTIONS,
+        budget=None,
+        breaker_error_rate=0.5,
+        breaker_reset_timeout=60,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.allowed_exceptions = allowed_exceptions
+        self.budget = budget if budget is not None else RetryBudget()
+        self.breaker_error_rate = breaker_error_rate
+        self.breaker_reset_timeout = breaker_reset_timeout
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            max_attempts=config.retry_max_attempts,
+            base_delay=config.retry_base_delay,
+            max_delay=config.retry_max_delay,
+            budget=RetryBudget(max_tokens=config.retry_budget),
+            breaker_error_rate=config.circuit_breaker_error_rate,
+            breaker_reset_timeout=config.circuit_breaker_reset,
+        )
+
+    def breaker(self, host):
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(
+                    error_rate=self.breaker_error_rate,
+                    reset_timeout=self.breaker_reset_timeout,
+                )
+            return self._breakers[host]
+
+    def backoff(self, attempt):
+        """
+        Seconds to wait after the given zero based attempt failed
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, host, func, *args, **kwargs):
+        """
+        Call func with retries. A retried method called from inside another
+        one, like get_storage_object from get_submission_results, runs once
+        without the policy so a failure is recorded and retried only by the
+        outermost call.
+        """
+        if getattr(self._local, "active", False):
+            return func(*args, **kwargs)
+        self._local.active = True
+        try:
+            return self._call(host, func, *args, **kwargs)
+        finally:
+            self._local.active = False
+
+    def _call(self, host, func, *args, **kwargs):
+        breaker = self.breaker(host)
+        for attempt in range(self.max_attempts):
+            if not breaker.allow():
+                raise CircuitOpenError(
+                    f"Too many failed requests to {host}, not calling {func.__name__}"
+                )
+            succeeded = False
+            try:
+                result = func(*args, **kwargs)
+                succeeded = True
+            except self.allowed_exceptions as e:
+                if attempt == self.max_attempts - 1 or not self.budget.try_spend():
+                    print(
+                        "An exception has occurred on attempt {}. Please re-run the script at a later time.".format(
+                            attempt + 1
+                        )
+                    )
+                    raise e
+                delay = self.backoff(attempt)
+                print(e)
+                print(
+                    "Attempt {} failed, retrying in {:.1f} seconds".format(
+                        attempt + 1, delay
+                    )
+                )
+            finally:
+                # every outcome is recorded, otherwise an unexpected exception
+                # in the trial call would leave the circuit open for good
+                breaker.record(succeeded)
+            if succeeded:
+                self.budget.record_success()
+                return result
+            sleep(delay)
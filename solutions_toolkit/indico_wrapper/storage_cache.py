@@ -0,0 +1,120 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+
+DEFAULT_MAX_MB = 1024
+# eviction frees space down to this fraction of max_mb, so the directory is
+# scanned once per freed slice instead of on every write of a full cache
+LOW_WATER_FRACTION = 0.9
+
+
+class StorageCache:
+    """
+    On disk cache of storage objects keyed by storage url
+
+    Storage objects like etl_output and page_info never change once written,
+    so they can be served from local disk on re-runs. Entries are written
+    atomically, the least recently used ones are evicted once the cache grows
+    past max_mb, down to a low water mark, and hits / misses are counted for reporting.
+    """
+
+    def __init__(self, cache_dir, max_mb=DEFAULT_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.low_water_bytes = int(self.max_bytes * LOW_WATER_FRACTION)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._size = sum(size for _, _, size in self._entries())
+
+    def get(self, storage_url):
+        """
+        Return the cached object for storage_url, or None on a miss
+        """
+        path = self._path(storage_url)
+        try:
+            with open(path) as f:
+                value = json.load(f)
+        except (FileNotFoundError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # mark the entry as recently used for eviction
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def set(self, storage_url, value):
+        """
+        Atomically write value to the cache, objects that are not json
+        serializable are skipped
+        """
+        try:
+            data = json.dumps(value).encode("utf-8")
+        except (TypeError, ValueError):
+            return
+
+        path = self._path(storage_url)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            self._size += len(data) - previous_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def get_or_fetch(self, storage_url, fetch):
+        """
+        Return the cached object for storage_url, calling fetch() and caching
+        its result on a miss
+        """
+        value = self.get(storage_url)
+        if value is None:
+            value = fetch()
+            self.set(storage_url, value)
+        return value
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "bytes": self._size}
+
+    def _path(self, storage_url):
+        key = hashlib.sha256(storage_url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _entries(self):
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".json"):
+                stat = entry.stat()
+                yield entry.path, stat.st_mtime, stat.st_size
+
+    def _evict(self):
+        """
+        Remove least recently used entries until the cache is back under
+        low_water_bytes, must be called with the lock held
+        """
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        self._size = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if self._size <= self.low_water_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._size -= size
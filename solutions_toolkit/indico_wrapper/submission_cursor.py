@@ -0,0 +1,82 @@
+import os
+import json
+import datetime
+
+# listing restarts this far before the high-water mark so submissions that
+# were committed late are still picked up, repeats are filtered out by id
+OVERLAP_SECONDS = 300
+
+
+def updated_at_utc(submission):
+    """
+    The client parses updatedAt into a naive local datetime or an aware one,
+    depending on the format the platform sent
+    """
+    return submission.updated_at.astimezone(datetime.timezone.utc)
+
+
+class SubmissionCursor:
+    """
+    High-water mark of the submissions listed per (workflow, status)
+
+    Holds the latest updated_at seen and the ids updated in the overlap window
+    before it, so IndicoWrapper.iter_submissions only yields submissions that
+    are new or were updated since they were last seen. Call advance for every
+    submission once it has been handled and save to persist the mark, without
+    a filepath the cursor only lives as long as the process.
+    """
+
+    def __init__(self, filepath=None, overlap_seconds=OVERLAP_SECONDS):
+        self.filepath = filepath
+        self.overlap = datetime.timedelta(seconds=overlap_seconds)
+        self.marks = {}
+        if filepath and os.path.exists(filepath):
+            with open(filepath) as f:
+                self.marks = json.load(f)
+
+    def since(self, workflow_id, status):
+        """
+        Return the updated_at to list from, None when nothing has been seen
+        """
+        mark = self.marks.get(self._key(workflow_id, status))
+        if mark is None:
+            return None
+        return datetime.datetime.fromisoformat(mark["updated_at"]) - self.overlap
+
+    def is_new(self, workflow_id, status, submission):
+        mark = self.marks.get(self._key(workflow_id, status))
+        if mark is None:
+            return True
+        updated_at = updated_at_utc(submission).isoformat()
+        return mark["seen"].get(str(submission.id)) != updated_at
+
+    def advance(self, workflow_id, status, submission):
+        key = self._key(workflow_id, status)
+        updated_at = updated_at_utc(submission)
+        mark = self.marks.setdefault(
+            key, {"updated_at": updated_at.isoformat(), "seen": {}}
+        )
+        high_water = max(
+            datetime.datetime.fromisoformat(mark["updated_at"]), updated_at
+        )
+        mark["updated_at"] = high_water.isoformat()
+        mark["seen"][str(submission.id)] = updated_at.isoformat()
+        # only ids inside the overlap window can be listed again
+        window_start = high_water - self.overlap
+        mark["seen"] = {
+            submission_id: seen_at
+            for submission_id, seen_at in mark["seen"].items()
+            if datetime.datetime.fromisoformat(seen_at) >= window_start
+        }
+
+    def save(self):
+        if not self.filepath:
+            return
+        tmp_path = f"{self.filepath}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.marks, f)
+        os.replace(tmp_path, self.filepath)
+
+    @staticmethod
+    def _key(workflow_id, status):
+        return f"{workflow_id}:{status}"
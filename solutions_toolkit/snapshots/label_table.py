@@ -0,0 +1,95 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+ROW_COL = "row"
+PAYLOAD_COL = "payload"
+
+
+class LabelTable:
+    """
+    The labels of a snapshot parsed into one row per label
+
+    labels has the position of the snapshot row the label belongs to, its
+    row_index and file_name, the label name, start and end, and the parsed
+    label dict as payload. Label operations are filters and renames on this
+    table; JSON is only written again by to_json. The label names in the
+    label column win over the ones in the payloads.
+    """
+
+    def __init__(self, index, labels):
+        # index of the snapshot rows, (row_index, file_name) in snapshot order
+        self.index = index
+        self.labels = labels
+
+    @classmethod
+    def from_json(cls, label_series):
+        """
+        Parse a series of label JSON strings indexed by (row_index, file_name)
+        """
+        rows, names, starts, ends, payloads = [], [], [], [], []
+        for row, label_string in enumerate(label_series.values):
+            for label in json.loads(label_string):
+                rows.append(row)
+                names.append(label["label"])
+                starts.append(label.get("start"))
+                ends.append(label.get("end"))
+                payloads.append(label)
+
+        index = label_series.index
+        rows = np.array(rows, dtype=np.int64)
+        labels = pd.DataFrame(
+            {
+                ROW_COL: rows,
+                "row_index": index.get_level_values(0).values[rows],
+                "file_name": index.get_level_values(1).values[rows],
+                "label": pd.Series(names, dtype=object),
+                "start": pd.Series(starts, dtype=object),
+                "end": pd.Series(ends, dtype=object),
+                PAYLOAD_COL: pd.Series(payloads, dtype=object),
+            }
+        )
+        return cls(index, labels)
+
+    def label_names(self):
+        return list(self.labels["label"].unique())
+
+    def remove(self, classes):
+        self.labels = self.labels[~self.labels["label"].isin(list(classes))]
+
+    def rename(self, original_label_name, new_label_name):
+        renamed = self.labels["label"] == original_label_name
+        if renamed.any():
+            self.labels = self.labels.copy()
+            self.labels.loc[renamed, "label"] = new_label_name
+
+    def filter(self, classes):
+        """
+        Return a new table with only the labels of classes
+        """
+        return LabelTable(self.index, self.labels[self.labels["label"].isin(list(classes))])
+
+    def to_lists(self):
+        """
+        Return a list of label dicts per snapshot row
+        """
+        row_labels = [[] for _ in range(len(self.index))]
+        for row, name, payload in zip(
+            self.labels[ROW_COL].values,
+            self.labels["label"].values,
+            self.labels[PAYLOAD_COL].values,
+        ):
+            if payload["label"] != name:
+                payload = dict(payload, label=name)
+            row_labels[row].append(payload)
+        return row_labels
+
+    def to_json(self):
+        """
+        Return a list of label JSON strings per snapshot row
+        """
+        return [json.dumps(labels) for labels in self.to_lists()]
+
+    def to_series(self, name=None):
+        return pd.Series(self.to_json(), index=self.index, name=name)
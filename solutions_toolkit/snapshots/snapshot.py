@@ -10,8 +10,8 @@ from solutions_toolkit.snapshots.utils import (
     get_submissions,
     get_submission_labels,
     find_overlaps,
-    filter_labels,
 )
+from solutions_toolkit.snapshots.label_table import LabelTable
 
 TARGET_COL = "target"
 LABEL_COL = "question"
@@ -63,33 +63,44 @@ class Snapshot:
         text_cols = self.index_cols + [self.text_col]
         self.text_df = unique_snapshot_df[text_cols].set_index(self.index_cols)
 
-    def remove_classes(self, classes_to_remove: Iterable[str]) -> None:
-
-        for i, row in self.label_df.iterrows():
-            current_label_list = json.loads(row[self.label_col])
-            removed_label_list = []
+    @property
+    def label_df(self):
+        """
+        The labels as JSON strings indexed by (row_index, file_name), written
+        from the parsed label table when label operations changed it
+        """
+        if self._labels_changed:
+            self._label_df[self.label_col] = self._label_table.to_json()
+            self._labels_changed = False
+        # the frame can be changed by the caller, parse it again next time
+        self._label_table = None
+        return self._label_df
+
+    @label_df.setter
+    def label_df(self, label_df):
+        self._label_df = label_df
+        self._label_table = None
+        self._labels_changed = False
+
+    def labels(self) -> LabelTable:
+        """
+        The parsed labels, the label JSON is only parsed by the first label
+        operation after label_df was read or set
+        """
+        if self._label_table is None:
+            self._label_table = LabelTable.from_json(self._label_df[self.label_col])
+        return self._label_table
 
-            for label in current_label_list:
-                if label["label"] not in classes_to_remove:
-                    removed_label_list.append(label)
-            removed_label_string = json.dumps(removed_label_list)
-            self.label_df.loc[i, self.label_col] = removed_label_string
+    def remove_classes(self, classes_to_remove: Iterable[str]) -> None:
+        self.labels().remove(classes_to_remove)
+        self._labels_changed = True
 
     def get_label_list(self) -> Iterable[str]:
-        label_set = set()
-        for i, row in self.label_df.iterrows():
-            labels = json.loads(row[self.label_col])
-            for label in labels:
-                label_set.add(label["label"])
-        return list(label_set)
+        return self.labels().label_names()
 
     def replace_label_name(self, original_label_name, new_label_name):
-        for i, row in self.label_df.iterrows():
-            labels = json.loads(row[self.label_col])
-            for label in labels:
-                if label["label"] == original_label_name:
-                    label["label"] = new_label_name
-            self.label_df.loc[i, self.label_col] = json.dumps(labels)
+        self.labels().rename(original_label_name, new_label_name)
+        self._labels_changed = True
 
     def to_df(self):
         snapshot_df = pd.concat([self.label_df, self.text_df], axis=1).reset_index()
@@ -192,9 +203,7 @@ class Snapshot:
         """
         Create a new snapshot with only classes in split_classes
         """
-        split_label_series = snapshot.label_df[snapshot.label_col].apply(
-            filter_labels, split_classes=split_classes
-        )
+        split_label_series = snapshot.labels().filter(split_classes).to_series()
         if add_to_snapshot:
             snapshot.label_df[new_label_col] = split_label_series.values
             return snapshot
@@ -211,22 +220,18 @@ def _merge_labels(snapshots, join="inner", label_col=LABEL_COL):
     """
     Currently we just remove overlapping labels
     """
-    label_dfs = [s.label_df for s in snapshots]
-    labelset_cols = [s.label_col for s in snapshots]
-    index_cols = snapshots[0].index_cols
-
-    label_df = pd.concat(label_dfs, axis=1, join=join)
-    label_df[label_col] = None
+    label_lists = [
+        pd.Series(s.labels().to_lists(), index=s.labels().index) for s in snapshots
+    ]
+    label_lists = pd.concat(label_lists, axis=1, join=join)
 
-    overlapping_data = {}
-    for i, row in label_df.iterrows():
+    merged_labels = []
+    for i, row_labels in zip(label_lists.index, label_lists.values):
         # initialize merge with first set of labels
-        merged_label = json.loads(row[labelset_cols[0]])
+        merged_label = row_labels[0]
         overlap = False
 
-        for labelset_col in labelset_cols[1:]:
-
-            labels_to_merge = json.loads(row[labelset_col])
+        for labels_to_merge in row_labels[1:]:
 
             # don't include files where labels overlap
             # TODO: Simplify this
@@ -235,12 +240,13 @@ def _merge_labels(snapshots, join="inner", label_col=LABEL_COL):
                 overlap = True
                 print("WARNING: Overlapping labels")
                 print(overlaps)
-                print(row)
+                print(i)
             else:
                 merged_label = merged_label + labels_to_merge
-        if not overlap:
-            label_df.loc[i, label_col] = json.dumps(merged_label)
-    return label_df[[label_col]].dropna()
+        merged_labels.append(None if overlap else json.dumps(merged_label))
+
+    label_df = pd.DataFrame({label_col: merged_labels}, index=label_lists.index)
+    return label_df.dropna()
 
 
 def _merge_text(snapshots, merged_labels):
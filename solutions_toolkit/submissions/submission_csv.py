@@ -5,7 +5,7 @@ prelabeld csv
 import json
 import pandas as pd
 from random import shuffle
-from solutions_toolkit.indico_wrapper import IndicoWrapper
+from solutions_toolkit.indico_wrapper import IndicoWrapper, StorageCache
 
 
 def validate_predictions(results, predictions):
@@ -57,8 +57,12 @@ API_TOKEN_PATH = (
 WORKFLOW_ID = 12
 N_ADDITIONAL_SAMPLES = 50
 MODEL_NAME = "Procurement COI q6 model"
+# NOTE, Configure, set to a directory e.g. "./storage_cache" to keep the
+# downloaded page text on disk for later runs
+STORAGE_CACHE_DIR = None
 
-indico_wrapper = IndicoWrapper(HOST, API_TOKEN_PATH)
+storage_cache = StorageCache(STORAGE_CACHE_DIR) if STORAGE_CACHE_DIR else None
+indico_wrapper = IndicoWrapper(HOST, API_TOKEN_PATH, storage_cache=storage_cache)
 complete_submissions = indico_wrapper.get_submissions(
     WORKFLOW_ID, submission_status="COMPLETE", retrieved_flag=True
 )
@@ -14,6 +14,22 @@ class ExportConfiguration(Configuration):
         self.uploaded_dir = self.get_key("UPLOADED_DIR")
         self.timeout = self.get_key("TIMEOUT")
         self.wait = self.get_key("WAIT")
+        self.upload_pipeline_depth = self.get_optional_key("UPLOAD_PIPELINE_DEPTH", 1)
+        self.upload_workers = self.get_optional_key("UPLOAD_WORKERS", 1)
+        self.adaptive_batch_seconds = self.get_optional_key("ADAPTIVE_BATCH_SECONDS")
+        self.upload_rate_file = self.get_optional_key(
+            "UPLOAD_RATE_FILE", "upload_rate.json"
+        )
+        self.upload_ledger_db = self.get_optional_key("UPLOAD_LEDGER_DB")
+        self.ingest_batch_size = self.get_optional_key("INGEST_BATCH_SIZE")
+        self.ingest_batch_delay = self.get_optional_key("INGEST_BATCH_DELAY", 5)
+        self.ingest_poll_interval = self.get_optional_key("INGEST_POLL_INTERVAL", 2)
+        self.ingest_metrics_file = self.get_optional_key("INGEST_METRICS_FILE")
+        self.ingest_max_attempts = self.get_optional_key("INGEST_MAX_ATTEMPTS", 5)
+        self.ingest_failed_dir = self.get_optional_key("INGEST_FAILED_DIR")
+        self.export_poll_interval = self.get_optional_key("EXPORT_POLL_INTERVAL", 30)
+        self.export_service_port = self.get_optional_key("EXPORT_SERVICE_PORT", 8765)
+        self.submission_cursor_file = self.get_optional_key("SUBMISSION_CURSOR_FILE")
         self.post_processing = self.get_key("POST_PROCESSING")
         
         self.retrieved = self.get_key("RETRIEVED")
@@ -30,6 +46,22 @@ class ExportConfiguration(Configuration):
         self.submissions_csv = self.get_key("SUBMISSIONS_CSV")
         self.log_file_dir = self.get_key("LOG_FILE_DIR")
         self.log_filename = self.get_key("LOG_FILENAME")
+        self.fetch_concurrency = self.get_optional_key("FETCH_CONCURRENCY", 1)
+        self.storage_cache_dir = self.get_optional_key("STORAGE_CACHE_DIR")
+        self.storage_cache_max_mb = self.get_optional_key("STORAGE_CACHE_MAX_MB", 1024)
+        self.retry_max_attempts = self.get_optional_key("RETRY_MAX_ATTEMPTS", 5)
+        self.retry_base_delay = self.get_optional_key("RETRY_BASE_DELAY", 2)
+        self.retry_max_delay = self.get_optional_key("RETRY_MAX_DELAY", 60)
+        self.retry_budget = self.get_optional_key("RETRY_BUDGET", 20)
+        self.circuit_breaker_error_rate = self.get_optional_key(
+            "CIRCUIT_BREAKER_ERROR_RATE", 0.5
+        )
+        self.circuit_breaker_reset = self.get_optional_key("CIRCUIT_BREAKER_RESET", 60)
+        self.rate_limit_per_second = self.get_optional_key("RATE_LIMIT_PER_SECOND")
+        self.rate_limit_burst = self.get_optional_key("RATE_LIMIT_BURST")
+        self.max_in_flight = self.get_optional_key("MAX_IN_FLIGHT")
+        self.rate_limit_state_file = self.get_optional_key("RATE_LIMIT_STATE_FILE")
+
     # TODO: this check needs to go layers deep
     def get_key(self, key):
         try:
@@ -38,6 +70,15 @@ class ExportConfiguration(Configuration):
             print(f"Missing configuration for {key}!!!!!")
             raise e
 
+    def get_optional_key(self, key, default=None):
+        """
+        Return the value for key, or default when the key is missing or empty
+        """
+        value = self.config.get(key)
+        if value is None:
+            return default
+        return value
+
     def get_list_key(self, key):
         try:
             if self.config[key]:
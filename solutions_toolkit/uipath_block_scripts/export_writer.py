@@ -0,0 +1,64 @@
+import os
+
+SUBMISSION_COLUMNS = ["Submission ID", "filename", "Reviewer ID"]
+PIVOT_VAL_COLS = ["text", "confidence"]
+
+
+def export_columns(doc_key_fields, page_key_fields, row_fields):
+    """
+    Return the fixed column order of the export file
+    """
+    columns = list(SUBMISSION_COLUMNS)
+    for label in doc_key_fields + page_key_fields + row_fields:
+        for pivot_val_col in PIVOT_VAL_COLS:
+            columns.append(f"{label} {pivot_val_col}")
+    return columns
+
+
+class ExportWriter:
+    """
+    Append-only csv writer for export batches
+
+    Every batch is appended to the same file with a fixed column order and
+    synced to disk before returning, so a batch is never rewritten and memory
+    only has to hold the batch being exported. The file is truncated by the
+    first write of a run unless append is True, a resumed run cuts off a
+    batch it did not finish with truncate.
+    """
+
+    def __init__(self, filepath, columns, append=False):
+        self.filepath = filepath
+        self.columns = columns
+        self.rows_written = 0
+        self._has_header = append and os.path.exists(filepath)
+
+    def offset(self):
+        """
+        Return the offset in the file the next batch is written at
+        """
+        return os.path.getsize(self.filepath) if self._has_header else 0
+
+    def truncate(self, offset):
+        """
+        Drop everything written after offset, such as a batch interrupted by
+        a crash or one whose completion was never recorded
+        """
+        if not self._has_header:
+            return
+        if offset > 0:
+            with open(self.filepath, "r+") as f:
+                f.truncate(offset)
+                f.flush()
+                os.fsync(f.fileno())
+        else:
+            self._has_header = False
+
+    def write_batch(self, batch_df):
+        batch_df = batch_df.reindex(columns=self.columns)
+        mode = "a" if self._has_header else "w"
+        with open(self.filepath, mode, newline="") as f:
+            batch_df.to_csv(f, index=False, header=not self._has_header)
+            f.flush()
+            os.fsync(f.fileno())
+        self._has_header = True
+        self.rows_written += len(batch_df)
@@ -80,18 +80,15 @@ def assign_confidences(results, model_name):
     ]
     preds_final = results["results"]["document"]["results"][model_name]["final"]
 
-    for pred_final in preds_final:
-        final_start = pred_final["start"]
-        final_end = pred_final["end"]
-        for pred_pre_review in preds_pre_review:
-            pre_start = pred_pre_review["start"]
-            pre_end = pred_pre_review["end"]
-            if (
-                final_start == pre_start
-                and final_end == pre_end
-                and pred_final["label"] == pred_pre_review["label"]
-            ):
-                pred_final["confidence"] = pred_pre_review["confidence"]
+    confidences = {}
+    for pred in preds_pre_review:
+        confidences[(pred["start"], pred["end"], pred["label"])] = pred["confidence"]
+
+    # last matching pre review prediction wins
+    for pred in preds_final:
+        key = (pred["start"], pred["end"], pred["label"])
+        if key in confidences:
+            pred["confidence"] = confidences[key]
     return preds_final
 
 
@@ -0,0 +1,91 @@
+import os
+import json
+import threading
+from collections import defaultdict
+
+FETCHED = "fetched"
+# recorded with the export file offset before a batch is written
+EXPORTING = "exporting"
+EXPORTED = "exported"
+EXCEPTION = "exception"
+MARKED_RETRIEVED = "marked_retrieved"
+
+
+class SubmissionLedger:
+    """
+    Append-only jsonl record of what has been done to each submission
+
+    Every line is {"submission_id": ..., "status": ..., **info} and is synced
+    to disk before record returns, so after a crash the ledger tells a re-run
+    exactly which submissions were already fetched, exported or marked
+    retrieved. A partially written last line is ignored on load.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self._statuses = defaultdict(dict)
+        self._lock = threading.Lock()
+        if os.path.exists(filepath):
+            with open(filepath) as f:
+                content = f.read()
+            for line in content.splitlines():
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._add(entry)
+            # start new entries on a fresh line after an interrupted write
+            if content and not content.endswith("\n"):
+                with open(filepath, "a") as f:
+                    f.write("\n")
+
+    def __len__(self):
+        return len(self._statuses)
+
+    def record(self, submission_id, status, **info):
+        self.record_many([submission_id], status, **info)
+
+    def record_many(self, submission_ids, status, **info):
+        """
+        Record the same status for several submissions with a single sync
+        """
+        entries = [
+            dict(submission_id=int(submission_id), status=status, **info)
+            for submission_id in submission_ids
+        ]
+        if not entries:
+            return
+        with self._lock:
+            with open(self.filepath, "a") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            for entry in entries:
+                self._add(entry)
+
+    def has(self, submission_id, status):
+        return status in self._statuses.get(int(submission_id), {})
+
+    def entries(self, status):
+        """
+        Return the recorded entries with status in the order they were first
+        recorded
+        """
+        return [
+            statuses[status]
+            for statuses in self._statuses.values()
+            if status in statuses
+        ]
+
+    def clear(self):
+        """
+        Remove the ledger once a run has finished cleanly
+        """
+        with self._lock:
+            if os.path.exists(self.filepath):
+                os.remove(self.filepath)
+            self._statuses.clear()
+
+    def _add(self, entry):
+        self._statuses[entry["submission_id"]][entry["status"]] = entry
@@ -0,0 +1,89 @@
+import numpy as np
+
+# (column name, dtype, getter) for every token attribute the export needs
+TOKEN_COLUMNS = (
+    ("start", np.int64, lambda token: token["doc_offset"]["start"]),
+    ("end", np.int64, lambda token: token["doc_offset"]["end"]),
+    ("bbtop", np.float64, lambda token: token["position"]["bbTop"]),
+    ("bbbot", np.float64, lambda token: token["position"]["bbBot"]),
+    ("bbleft", np.float64, lambda token: token["position"]["bbLeft"]),
+    ("bbright", np.float64, lambda token: token["position"]["bbRight"]),
+    ("page_num", np.int64, lambda token: token["page_num"]),
+)
+
+
+class TokenTable:
+    """
+    Columnar table of the tokens of one document
+
+    Offsets, bounding boxes and page numbers are kept as parallel NumPy arrays
+    so the page_info dicts can be dropped as soon as each page is parsed.
+    Tokens are normally in document order, in which case the first token
+    overlapping each prediction is found with a vectorized binary search over
+    the token end offsets. If the offsets are not sorted we fall back to a scan
+    per prediction so results always match a scan of the token list.
+    """
+
+    def __init__(self, start, end, bbtop, bbbot, bbleft, bbright, page_num):
+        self.start = start
+        self.end = end
+        self.bbtop = bbtop
+        self.bbbot = bbbot
+        self.bbleft = bbleft
+        self.bbright = bbright
+        self.page_num = page_num
+        self.is_sorted = bool(
+            np.all(np.diff(start) >= 0) and np.all(np.diff(end) >= 0)
+        )
+
+    def __len__(self):
+        return len(self.start)
+
+    @classmethod
+    def from_pages(cls, page_infos):
+        """
+        Build a table from an iterable of page_info dicts, each page is
+        converted to arrays before the next one is read
+        """
+        page_columns = {name: [] for name, _, _ in TOKEN_COLUMNS}
+        for page_info in page_infos:
+            tokens = page_info["tokens"]
+            for name, dtype, getter in TOKEN_COLUMNS:
+                page_columns[name].append(
+                    np.fromiter(map(getter, tokens), dtype=dtype, count=len(tokens))
+                )
+
+        columns = []
+        for name, dtype, _ in TOKEN_COLUMNS:
+            if page_columns[name]:
+                columns.append(np.concatenate(page_columns[name]))
+            else:
+                columns.append(np.empty(0, dtype=dtype))
+        return cls(*columns)
+
+    def first_overlaps(self, starts, ends):
+        """
+        Return the row of the first token in document order overlapping each
+        (start, end) span, -1 where no token overlaps
+        """
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        rows = np.full(len(starts), -1, dtype=np.int64)
+        if not len(self):
+            return rows
+
+        if not self.is_sorted:
+            for i, (start, end) in enumerate(zip(starts, ends)):
+                overlaps = (self.start < end) & (start < self.end)
+                if overlaps.any():
+                    rows[i] = np.argmax(overlaps)
+            return rows
+
+        # first token that ends after the span starts, every earlier token
+        # ends before it and every later token starts at or after this one
+        candidates = np.searchsorted(self.end, starts, side="right")
+        in_range = candidates < len(self)
+        found = np.zeros(len(starts), dtype=bool)
+        found[in_range] = self.start[candidates[in_range]] < ends[in_range]
+        rows[found] = candidates[found]
+        return rows
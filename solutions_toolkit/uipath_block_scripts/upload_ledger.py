@@ -0,0 +1,109 @@
+import hashlib
+import sqlite3
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+HASH_CHUNK_SIZE = 1024 * 1024
+HASH_WORKERS = 8
+
+
+def file_sha256(filepath, chunk_size=HASH_CHUNK_SIZE):
+    """
+    Hash a file in fixed size chunks so large documents are never fully read
+    into memory
+    """
+    sha256 = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def hash_files(filepaths, workers=HASH_WORKERS):
+    """
+    Return {filepath: sha256} hashing files from a thread pool, hashlib
+    releases the GIL while it hashes each chunk
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return dict(zip(filepaths, executor.map(file_sha256, filepaths)))
+
+
+class UploadLedger:
+    """
+    SQLite record of every document uploaded to the workflow, keyed by the
+    sha256 of its content, plus the duplicate files that were linked to an
+    earlier submission instead of being uploaded again
+
+    Safe to share between upload worker threads.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS uploads (
+                    sha256 TEXT PRIMARY KEY,
+                    submission_id INTEGER NOT NULL,
+                    filename TEXT NOT NULL,
+                    uploaded_at TEXT NOT NULL
+                )
+                """
+            )
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS duplicates (
+                    sha256 TEXT NOT NULL,
+                    submission_id INTEGER NOT NULL,
+                    filename TEXT NOT NULL,
+                    seen_at TEXT NOT NULL
+                )
+                """
+            )
+
+    def submission_ids(self, hashes):
+        """
+        Return {sha256: submission_id} for the hashes already uploaded
+        """
+        hashes = list(set(hashes))
+        found = {}
+        with self._lock:
+            # stay under sqlite's limit on query parameters
+            for chunk_start in range(0, len(hashes), 500):
+                chunk = hashes[chunk_start : chunk_start + 500]
+                rows = self.connection.execute(
+                    "SELECT sha256, submission_id FROM uploads WHERE sha256 IN ({})".format(
+                        ", ".join("?" * len(chunk))
+                    ),
+                    chunk,
+                )
+                found.update(rows)
+        return found
+
+    def record_uploads(self, uploads):
+        """
+        uploads is a list of (sha256, submission_id, filename)
+        """
+        now = datetime.datetime.now().isoformat()
+        with self._lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?)",
+                [(sha256, int(sid), filename, now) for sha256, sid, filename in uploads],
+            )
+
+    def record_duplicates(self, duplicates):
+        """
+        duplicates is a list of (sha256, submission_id, filename)
+        """
+        now = datetime.datetime.now().isoformat()
+        with self._lock, self.connection:
+            self.connection.executemany(
+                "INSERT INTO duplicates VALUES (?, ?, ?, ?)",
+                [(sha256, int(sid), filename, now) for sha256, sid, filename in duplicates],
+            )
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,70 @@
+import os
+import re
+import json
+import threading
+
+# page objects, but not the /Pages tree nodes
+PAGE_OBJECT_REGEX = re.compile(rb"/Type\s*/Page(?![A-Za-z])")
+# the "3 page/sec" rule of thumb used before any rate has been observed
+DEFAULT_PAGES_PER_SECOND = 3.0
+# weight of the newest observation in the moving average
+SMOOTHING = 0.3
+# batches get this many times their expected processing time before timing out
+TIMEOUT_SAFETY_FACTOR = 3
+
+
+def pdf_page_count(filepath):
+    """
+    Count the page objects of a pdf without parsing it. Pages stored inside
+    compressed object streams are not visible, those files count as one page
+    """
+    with open(filepath, "rb") as f:
+        count = len(PAGE_OBJECT_REGEX.findall(f.read()))
+    return max(count, 1)
+
+
+class ProcessingRate:
+    """
+    Exponentially weighted moving average of the pages per second a batch is
+    processed at, measured from upload until its submissions finish, kept in
+    a json file so the next run starts from the learned rate
+    """
+
+    def __init__(self, filepath, smoothing=SMOOTHING):
+        self.filepath = filepath
+        self.smoothing = smoothing
+        self.pages_per_second = DEFAULT_PAGES_PER_SECOND
+        self.observations = 0
+        self._lock = threading.Lock()
+        if os.path.exists(filepath):
+            with open(filepath) as f:
+                state = json.load(f)
+            self.pages_per_second = state["pages_per_second"]
+            self.observations = state["observations"]
+
+    def observe(self, pages, seconds):
+        if seconds <= 0:
+            return
+        rate = pages / seconds
+        with self._lock:
+            if self.observations:
+                self.pages_per_second += self.smoothing * (rate - self.pages_per_second)
+            else:
+                self.pages_per_second = rate
+            self.observations += 1
+
+    def expected_seconds(self, pages):
+        return pages / self.pages_per_second
+
+    def save(self):
+        tmp_path = f"{self.filepath}.tmp"
+        with self._lock:
+            with open(tmp_path, "w") as f:
+                json.dump(
+                    {
+                        "pages_per_second": self.pages_per_second,
+                        "observations": self.observations,
+                    },
+                    f,
+                )
+        os.replace(tmp_path, self.filepath)
@@ -0,0 +1,159 @@
+import os
+import select
+import struct
+import ctypes
+import ctypes.util
+from time import sleep, monotonic
+from fnmatch import fnmatch
+
+# from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct("iIII")
+READ_SIZE = 64 * 1024
+
+
+def ready_files(directory, pattern):
+    return sorted(
+        entry.path
+        for entry in os.scandir(directory)
+        if entry.is_file() and fnmatch(entry.name, pattern)
+    )
+
+
+class PollingWatcher:
+    """
+    Report files matching pattern once they are fully written, judged by
+    their size and modification time not changing for interval seconds
+    """
+
+    def __init__(self, directory, pattern="*.pdf", interval=2):
+        self.directory = directory
+        self.pattern = pattern
+        self.interval = interval
+        self._pending = {}
+        self._reported = set()
+
+    def poll(self, timeout):
+        """
+        Return the newly completed files, waiting up to timeout seconds
+        """
+        deadline = monotonic() + timeout
+        while True:
+            ready = self._scan()
+            if ready or monotonic() >= deadline:
+                return ready
+            sleep(min(self.interval, max(0, deadline - monotonic())))
+
+    def _scan(self):
+        present = {}
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and fnmatch(entry.name, self.pattern):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                present[entry.path] = (stat.st_size, stat.st_mtime_ns)
+
+        now = monotonic()
+        ready = []
+        for path, signature in present.items():
+            if path in self._reported:
+                continue
+            pending = self._pending.get(path)
+            if pending is None or pending[0] != signature:
+                self._pending[path] = (signature, now)
+            elif now - pending[1] >= self.interval:
+                ready.append(path)
+                self._reported.add(path)
+                del self._pending[path]
+        # forget files that were moved away so a new file with the same name
+        # is reported again
+        self._reported.intersection_update(present)
+        for path in set(self._pending) - set(present):
+            del self._pending[path]
+        return sorted(ready)
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """
+    Report files matching pattern as soon as the writer closes them or they
+    are moved into the directory, using inotify through ctypes. Files already
+    in the directory are reported by the first poll. A file can be reported
+    more than once.
+
+    Raises OSError where inotify is not available, see create_watcher.
+    """
+
+    def __init__(self, directory, pattern="*.pdf"):
+        self.directory = directory
+        self.pattern = pattern
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        wd = libc.inotify_add_watch(
+            self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO
+        )
+        if wd < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"cannot watch {directory}")
+        self._rescan = True
+
+    def poll(self, timeout):
+        """
+        Return the newly completed files, waiting up to timeout seconds
+        """
+        if self._rescan:
+            self._rescan = False
+            # drop queued events first, files closed after this are reported
+            # by both the scan and the next poll, callers ignore the repeats
+            self._read_events()
+            return ready_files(self.directory, self.pattern)
+
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        return self._read_events()
+
+    def _read_events(self):
+        ready = []
+        while True:
+            try:
+                buffer = os.read(self.fd, READ_SIZE)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(buffer):
+                _, mask, _, name_length = EVENT_HEADER.unpack_from(buffer, offset)
+                offset += EVENT_HEADER.size
+                name = buffer[offset : offset + name_length].rstrip(b"\0")
+                offset += name_length
+                if mask & IN_Q_OVERFLOW:
+                    # events were dropped, pick the files up with a scan
+                    self._rescan = True
+                elif name and fnmatch(os.fsdecode(name), self.pattern):
+                    ready.append(os.path.join(self.directory, os.fsdecode(name)))
+        return ready
+
+    def close(self):
+        os.close(self.fd)
+
+
+def create_watcher(directory, pattern="*.pdf", poll_interval=2):
+    """
+    Return an InotifyWatcher where the platform supports it, otherwise a
+    PollingWatcher
+    """
+    try:
+        return InotifyWatcher(directory, pattern)
+    except (OSError, AttributeError, TypeError):
+        return PollingWatcher(directory, pattern, poll_interval)
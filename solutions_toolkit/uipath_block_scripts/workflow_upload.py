@@ -9,7 +9,7 @@ import os
 
 from solutions_toolkit.uipath_block_scripts.utils import files_from_directory, move_file
 from solutions_toolkit.uipath_block_scripts.config import ExportConfiguration
-from solutions_toolkit.indico_wrapper import IndicoWrapper
+from solutions_toolkit.indico_wrapper import IndicoWrapper, RateLimiter
 
 
 USAGE_STRING = "USAGE: python3 -m solutions_toolkit.uipath_block_scripts.workflow_upload <configuration_file>"
@@ -21,7 +21,11 @@ class WorkflowUpload:
         self.workflow_id = config.workflow_id
         self.uploaded_dir = config.uploaded_dir
         self.timeout = config.timeout
-        self.indico_wrapper = IndicoWrapper(config.host, config.api_token_path)
+        self.indico_wrapper = IndicoWrapper(
+            config.host,
+            config.api_token_path,
+            rate_limiter=RateLimiter.from_config(config),
+        )
 
     def upload_to_workflow(self, pdf_filepaths, wait=False):
         submission_ids = []
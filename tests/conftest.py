@@ -0,0 +1,8 @@
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the scripts import each other by module name, as when run from scripts/
+for path in (REPO_DIR, os.path.join(REPO_DIR, "scripts")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
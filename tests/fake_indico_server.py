@@ -0,0 +1,89 @@
+"""
+Local stand-in for the Indico platform endpoints the async wrapper uses
+
+Answers the token refresh, GraphQL and storage requests of AsyncIndicoClient
+on 127.0.0.1, and records the client connections it saw and how many
+requests were in flight at once.
+"""
+import asyncio
+
+from aiohttp import web
+
+SUBMISSION = {
+    "id": 1,
+    "datasetId": 1,
+    "workflowId": 2,
+    "status": "COMPLETE",
+    "inputFilename": "invoice.pdf",
+    "resultFile": "indico-file:///storage/result.json",
+    "retrieved": False,
+    "errors": None,
+    "inputFiles": [],
+}
+
+
+class FakeIndicoServer:
+    """
+    Usage:
+        async with FakeIndicoServer() as server:
+            host = server.host
+    """
+
+    def __init__(self, storage_delay=0.01):
+        self.storage_delay = storage_delay
+        self.host = None
+        self.connections = set()
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.retrieved = set()
+        self._runner = None
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post("/auth/users/refresh_token", self.refresh_token)
+        app.router.add_post("/graph/api/graphql", self.graphql)
+        app.router.add_route("*", "/storage/{name}", self.storage)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.host = f"127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._runner.cleanup()
+
+    def _track(self, request):
+        self.connections.add(request.transport.get_extra_info("peername"))
+        self.requests += 1
+
+    async def refresh_token(self, request):
+        return web.json_response({"auth_token": "token"})
+
+    async def graphql(self, request):
+        self._track(request)
+        body = await request.json()
+        query = body["query"]
+        variables = body.get("variables") or {}
+        if "updateSubmission" in query:
+            self.retrieved.add(variables["submissionId"])
+            return web.json_response(
+                {"data": {"updateSubmission": dict(SUBMISSION, retrieved=True)}}
+            )
+        if "submission(" in query:
+            return web.json_response(
+                {"data": {"submission": dict(SUBMISSION, id=variables["submissionId"])}}
+            )
+        return web.json_response({"data": {"echo": variables}})
+
+    async def storage(self, request):
+        self._track(request)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.storage_delay)
+        finally:
+            self.in_flight -= 1
+        return web.json_response({"name": request.match_info["name"]})
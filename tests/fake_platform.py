@@ -0,0 +1,162 @@
+"""
+In-memory stand-in for the Indico platform behind IndicoWrapper
+
+FakeIndicoClient answers the ListSubmissions, GetSubmission, UpdateSubmission,
+SubmissionResult and RetrieveStorageObject requests and the bulk retrieved
+mutation IndicoWrapper makes with the submissions and storage objects of a
+FakePlatform. Listings page like the platform: after is an offset into the
+filtered, ordered listing, so a submission that stops matching the filters
+while the listing is walked shifts the pages after it.
+"""
+import copy
+import datetime
+from types import SimpleNamespace
+
+from indico.queries import (
+    GetSubmission,
+    GraphQLRequest,
+    ListSubmissions,
+    RetrieveStorageObject,
+    SubmissionResult,
+    UpdateSubmission,
+)
+
+# updatedAt of submission n is this plus n hours
+UPDATED_AT_START = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def submission_payload(submission_id, status, workflow_id=1):
+    return {
+        "id": submission_id,
+        "datasetId": 1,
+        "workflowId": workflow_id,
+        "status": status,
+        "inputFilename": f"file_{submission_id}.pdf",
+        "resultFile": f"indico-file:///storage/{submission_id}.json",
+        "retrieved": False,
+        "errors": None,
+        "autoReview": None,
+        "updatedAt": (
+            UPDATED_AT_START + datetime.timedelta(hours=submission_id)
+        ).isoformat(),
+    }
+
+
+class FakePlatform:
+    """
+    Usage:
+        platform = FakePlatform({"COMPLETE": range(1, 11)})
+        monkeypatch.setattr(indico_wrapper_module, "IndicoClient", platform.client)
+    """
+
+    def __init__(self, submission_ids_by_status, workflow_id=1):
+        self.submissions = {}
+        for status, submission_ids in submission_ids_by_status.items():
+            for submission_id in submission_ids:
+                self.submissions[submission_id] = submission_payload(
+                    submission_id, status, workflow_id
+                )
+        # {storage path: object}, e.g. "/storage/1.json" for the result file
+        # of submission 1
+        self.storage = {}
+        # {submission id: exception} raised when its result is requested
+        self.result_errors = {}
+        self.list_calls = 0
+
+    def client(self, config=None):
+        return FakeIndicoClient(self)
+
+    def touch(self, submission_id, **changes):
+        """
+        Change a submission the way the platform would, moving its updatedAt
+        """
+        payload = self.submissions[submission_id]
+        payload.update(changes)
+        updated_at = datetime.datetime.fromisoformat(payload["updatedAt"])
+        payload["updatedAt"] = (updated_at + datetime.timedelta(days=1)).isoformat()
+
+    def listing(self, variables):
+        # a filter on several fields is sent as {"AND": [fields]}
+        filters = dict(variables.get("filters") or {})
+        for clause in filters.pop("AND", []):
+            filters.update(clause)
+        submissions = [
+            payload
+            for payload in self.submissions.values()
+            if self._matches(payload, variables, filters)
+        ]
+        order_key = "updatedAt" if variables.get("orderBy") == "UPDATED_AT" else "id"
+        return sorted(
+            submissions,
+            key=lambda payload: (payload[order_key], payload["id"]),
+            reverse=variables.get("desc", True),
+        )
+
+    @staticmethod
+    def _matches(payload, variables, filters):
+        if variables.get("submissionIds") is not None:
+            if payload["id"] not in variables["submissionIds"]:
+                return False
+        if variables.get("workflowIds") is not None:
+            if payload["workflowId"] not in variables["workflowIds"]:
+                return False
+        if filters.get("status") not in (None, payload["status"]):
+            return False
+        if filters.get("retrieved") not in (None, payload["retrieved"]):
+            return False
+        updated_from = (filters.get("updatedAt") or {}).get("from")
+        if updated_from is not None:
+            if datetime.datetime.fromisoformat(payload["updatedAt"]) < (
+                datetime.datetime.fromisoformat(updated_from)
+            ):
+                return False
+        return True
+
+
+class FakeIndicoClient:
+    def __init__(self, platform):
+        self.platform = platform
+
+    def call(self, request):
+        if isinstance(request, ListSubmissions):
+            return request.process_response({"data": self._list(request.variables)})
+        if isinstance(request, GetSubmission):
+            payload = self.platform.submissions[request.variables["submissionId"]]
+            return request.process_response({"data": {"submission": dict(payload)}})
+        if isinstance(request, UpdateSubmission):
+            submission_id = request.variables["submissionId"]
+            self.platform.touch(submission_id, retrieved=request.variables["retrieved"])
+            payload = dict(self.platform.submissions[submission_id])
+            return request.process_response({"data": {"updateSubmission": payload}})
+        if isinstance(request, SubmissionResult):
+            submission_id = request.submission_id
+            if submission_id in self.platform.result_errors:
+                raise self.platform.result_errors[submission_id]
+            return SimpleNamespace(
+                result=self.platform.submissions[submission_id]["resultFile"]
+            )
+        if isinstance(request, RetrieveStorageObject):
+            return copy.deepcopy(self.platform.storage[request.path])
+        if isinstance(request, GraphQLRequest) and "updateSubmission" in request.query:
+            # IndicoWrapper.mark_retrieved_many, one aliased mutation per id
+            for submission_id in request.variables.values():
+                self.platform.touch(submission_id, retrieved=True)
+            return {}
+        raise NotImplementedError(type(request).__name__)
+
+    def _list(self, variables):
+        self.platform.list_calls += 1
+        listing = self.platform.listing(variables)
+        offset = variables.get("after") or 0
+        limit = variables.get("limit") or len(listing)
+        page = listing[offset : offset + limit]
+        has_next_page = offset + limit < len(listing)
+        return {
+            "submissions": {
+                "submissions": [dict(payload) for payload in page],
+                "pageInfo": {
+                    "endCursor": offset + limit,
+                    "hasNextPage": has_next_page,
+                },
+            }
+        }
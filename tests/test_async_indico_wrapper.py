@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from indico.queries import GetSubmission
+
+from solutions_toolkit.indico_wrapper import RateLimiter
+from solutions_toolkit.indico_wrapper.async_indico_wrapper import AsyncIndicoWrapper
+from fake_indico_server import FakeIndicoServer
+
+
+@pytest.fixture
+def api_token_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("INDICO_PROTOCOL", "http")
+    path = tmp_path / "indico_api_token.txt"
+    path.write_text("token")
+    return str(path)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_gathered_calls_share_pooled_connections(api_token_path):
+    async def main():
+        async with FakeIndicoServer() as server:
+            async with AsyncIndicoWrapper(
+                server.host, api_token_path, max_connections=10
+            ) as indico_wrapper:
+                results = await asyncio.gather(
+                    *(
+                        indico_wrapper.get_storage_object(f"indico-file:///storage/{i}.json")
+                        for i in range(200)
+                    )
+                )
+            return server, results
+
+    server, results = run(main())
+    assert [result["name"] for result in results] == [f"{i}.json" for i in range(200)]
+    assert server.max_in_flight <= 10
+    assert len(server.connections) <= 10
+
+
+def test_submission_calls(api_token_path):
+    async def main():
+        async with FakeIndicoServer() as server:
+            async with AsyncIndicoWrapper(server.host, api_token_path) as indico_wrapper:
+                submission = await indico_wrapper.get_submission(7)
+                await indico_wrapper.mark_retreived(submission)
+                echo = await indico_wrapper.graphQL_request("query Echo { echo }", {"a": 1})
+            return server, submission, echo
+
+    server, submission, echo = run(main())
+    assert submission.id == 7
+    assert submission.input_filename == "invoice.pdf"
+    assert server.retrieved == {7}
+    assert echo == {"echo": {"a": 1}}
+
+
+def test_call_before_create_raises(api_token_path):
+    indico_wrapper = AsyncIndicoWrapper("127.0.0.1:1", api_token_path)
+    with pytest.raises(RuntimeError, match="create"):
+        run(indico_wrapper.call(GetSubmission(1)))
+
+
+class RecordingLimiter(RateLimiter):
+    """
+    Makes the first call wait and records the threads reserve ran on
+    """
+
+    def __init__(self, first_wait):
+        super().__init__(rate=1000, burst=1000)
+        self.first_wait = first_wait
+        self.threads = []
+
+    def reserve(self):
+        self.threads.append(threading.current_thread())
+        super().reserve()
+        return self.first_wait if len(self.threads) == 1 else 0.0
+
+
+def test_rate_limit_waits_off_the_loop_without_a_connection_slot(api_token_path):
+    rate_limiter = RecordingLimiter(first_wait=0.5)
+
+    async def timed(indico_wrapper, name):
+        await indico_wrapper.get_storage_object(f"indico-file:///storage/{name}.json")
+        return time.monotonic()
+
+    async def main():
+        async with FakeIndicoServer() as server:
+            async with AsyncIndicoWrapper(
+                server.host, api_token_path, max_connections=1, rate_limiter=rate_limiter
+            ) as indico_wrapper:
+                waiting = asyncio.ensure_future(timed(indico_wrapper, "waiting"))
+                await asyncio.sleep(0.05)
+                ready = await timed(indico_wrapper, "ready")
+                return ready, await waiting
+
+    ready, waiting = run(main())
+    # the call waiting on the rate limit did not hold the only connection slot
+    assert ready < waiting
+    assert threading.main_thread() not in rate_limiter.threads
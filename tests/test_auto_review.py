@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+
+import pytest
+
+from solutions_toolkit.auto_review import auto_review
+from solutions_toolkit.auto_review.review_plan import ReviewPlan
+from solutions_toolkit.uipath_block_scripts.ledger import SubmissionLedger
+
+MODEL_NAME = "model"
+
+
+class FakeReviewWrapper:
+    """
+    Holds the platform status of each submission and records the reviews
+    submitted, failing the review of the ids in fail_ids after the platform
+    kept a partial auto review
+    """
+
+    def __init__(self, statuses, fail_ids=()):
+        self.statuses = dict(statuses)
+        self.auto_reviews = {}
+        self.fail_ids = set(fail_ids)
+        self.reviewed = []
+
+    def get_submission(self, submission_id):
+        return SimpleNamespace(
+            id=submission_id,
+            status=self.statuses[submission_id],
+            auto_review=self.auto_reviews.get(submission_id),
+        )
+
+    def get_workflow_output(self, submission):
+        predictions = [{"label": "Total", "start": 0, "end": 1, "text": "1"}]
+        return {"results": {"document": {"results": {MODEL_NAME: predictions}}}}
+
+    def submit_updated_review(self, submission, updated_predictions):
+        self.auto_reviews[submission.id] = {"id": submission.id}
+        if submission.id in self.fail_ids:
+            raise ConnectionError("connection reset")
+        self.reviewed.append(submission.id)
+        self.statuses[submission.id] = auto_review.COMPLETE_STATUS
+
+
+def submissions(*submission_ids):
+    return [
+        SimpleNamespace(id=submission_id, input_filename=f"file_{submission_id}.pdf")
+        for submission_id in submission_ids
+    ]
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return SubmissionLedger(str(tmp_path / "auto_review_ledger.jsonl"))
+
+
+def run(indico_wrapper, ledger, submission_ids):
+    runner = auto_review.AutoReviewRunner(
+        indico_wrapper, MODEL_NAME, ReviewPlan.compile({}), ledger, workers=2
+    )
+    handled = []
+    outcomes = runner.run(
+        submissions(*submission_ids),
+        on_done=lambda submission: handled.append(submission.id),
+    )
+    return outcomes, sorted(handled)
+
+
+def test_outcomes_are_counted(ledger):
+    indico_wrapper = FakeReviewWrapper(
+        {1: auto_review.AUTO_REVIEW_STATUS, 2: auto_review.AUTO_REVIEW_STATUS, 3: "COMPLETE"}
+    )
+    ledger.record(2, auto_review.REVIEW_SUBMITTED)
+    outcomes, handled = run(indico_wrapper, ledger, [1, 2, 3])
+    assert outcomes == {
+        auto_review.SUBMITTED: 1,
+        auto_review.ALREADY_SUBMITTED: 1,
+        auto_review.SKIPPED: 1,
+    }
+    assert handled == [1, 2, 3]
+    assert indico_wrapper.reviewed == [1]
+
+
+def test_a_partly_written_review_is_submitted_again(ledger):
+    indico_wrapper = FakeReviewWrapper({1: auto_review.AUTO_REVIEW_STATUS}, fail_ids=[1])
+    outcomes, handled = run(indico_wrapper, ledger, [1])
+    assert outcomes == {auto_review.FAILED: 1}
+    assert handled == []
+
+    # the platform kept an auto review but the submission still waits for one
+    indico_wrapper.fail_ids.clear()
+    outcomes, handled = run(indico_wrapper, ledger, [1])
+    assert outcomes == {auto_review.SUBMITTED: 1}
+    assert indico_wrapper.reviewed == [1]
+    assert ledger.has(1, auto_review.REVIEW_SUBMITTED)
+
+
+def test_a_review_taken_before_a_crash_is_not_sent_again(ledger):
+    indico_wrapper = FakeReviewWrapper({1: auto_review.COMPLETE_STATUS})
+    ledger.record(1, auto_review.REVIEW_SUBMITTING)
+    outcomes, _ = run(indico_wrapper, ledger, [1])
+    assert outcomes == {auto_review.ALREADY_SUBMITTED: 1}
+    assert indico_wrapper.reviewed == []
+    assert ledger.has(1, auto_review.REVIEW_SUBMITTED)
@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+import pytest
+
+import export_service
+import solutions_toolkit.indico_wrapper.indico_wrapper as indico_wrapper_module
+from solutions_toolkit.indico_wrapper import IndicoWrapper, SubmissionCursor
+from fake_platform import FakePlatform
+
+
+@pytest.fixture
+def indico_wrapper(tmp_path, monkeypatch):
+    platform = FakePlatform({"COMPLETE": [1, 2, 3], "PENDING_ADMIN_REVIEW": [4]})
+    monkeypatch.setattr(indico_wrapper_module, "IndicoClient", platform.client)
+    api_token_path = tmp_path / "indico_api_token.txt"
+    api_token_path.write_text("token")
+    indico_wrapper = IndicoWrapper("indico.local", str(api_token_path))
+    monkeypatch.setattr(
+        export_service, "create_indico_wrapper", lambda config: indico_wrapper
+    )
+    monkeypatch.setattr(export_service, "load_review_plan", lambda config: None)
+    return indico_wrapper
+
+
+@pytest.fixture
+def config(tmp_path):
+    return SimpleNamespace(
+        workflow_id=1,
+        retrieved=None,
+        submission_cursor_file=str(tmp_path / "cursor.json"),
+    )
+
+
+def listed_ids(indico_wrapper, config, status):
+    cursor = SubmissionCursor(config.submission_cursor_file)
+    return [
+        submission.id
+        for submission in indico_wrapper.iter_submissions(
+            config.workflow_id, status, cursor=cursor
+        )
+    ]
+
+
+def test_export_new_advances_the_cursor_only_past_handled_submissions(
+    indico_wrapper, config, monkeypatch
+):
+    def run_export(config, indico_wrapper, review_plan, append, cursor, **submissions):
+        # the export leaves submission 3 for the next one
+        for submission in submissions["complete_submissions"]:
+            if submission.id != 3:
+                cursor.advance(config.workflow_id, "COMPLETE", submission)
+        for submission in submissions["exception_submissions"]:
+            cursor.advance(config.workflow_id, "PENDING_ADMIN_REVIEW", submission)
+        cursor.save()
+        return {"submissions": 2, "rows": 2, "exceptions": 1}
+
+    monkeypatch.setattr(export_service, "run_export", run_export)
+    export_service.ExportService(config).export_new()
+
+    assert listed_ids(indico_wrapper, config, "COMPLETE") == [3]
+    assert listed_ids(indico_wrapper, config, "PENDING_ADMIN_REVIEW") == []
+
+
+def test_a_failed_export_does_not_move_the_cursor(indico_wrapper, config, monkeypatch):
+    def run_export(config, indico_wrapper, review_plan, append, cursor, **submissions):
+        cursor.advance(config.workflow_id, "COMPLETE", submissions["complete_submissions"][0])
+        raise ConnectionError("platform unreachable")
+
+    monkeypatch.setattr(export_service, "run_export", run_export)
+    service = export_service.ExportService(config)
+    assert "error" in service.handle("export")
+    assert [submission.id for submission in service._new_submissions("COMPLETE")] == [1, 2, 3]
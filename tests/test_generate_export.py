@@ -0,0 +1,319 @@
+import io
+import os
+import random
+
+import pandas as pd
+import pytest
+
+import generate_export
+import solutions_toolkit.indico_wrapper.indico_wrapper as indico_wrapper_module
+from solutions_toolkit.indico_wrapper import (
+    CircuitOpenError,
+    IndicoWrapper,
+    SubmissionCursor,
+)
+from solutions_toolkit.uipath_block_scripts.config import ExportConfiguration
+from solutions_toolkit.uipath_block_scripts.export_writer import ExportWriter
+from solutions_toolkit.uipath_block_scripts.ledger import SubmissionLedger, EXPORTED
+from fake_platform import FakePlatform
+
+MODEL_NAME = "model"
+DOC_KEY_FIELDS = ["Account Number", "Ending Date"]
+ROW_FIELDS = ["Deposit Date", "Deposit Amount", "Check Number"]
+COMPLETE_IDS = list(range(1, 11))
+EXCEPTION_IDS = [100, 101]
+# their reviewer used Add Value on a row field, which makes them exceptions
+ADDED_VALUE_IDS = [3, 10]
+
+
+def add_document(platform, submission_id):
+    """
+    Store the result file, etl output and pages of a random document
+    """
+    rng = random.Random(submission_id)
+    pages = []
+    offset = 0
+    for page_num in range(rng.randint(1, 3)):
+        tokens = []
+        for t in range(rng.randint(10, 40)):
+            length = rng.randint(1, 6)
+            top = (t // 4) * 20
+            tokens.append(
+                {
+                    "doc_offset": {"start": offset, "end": offset + length},
+                    "page_num": page_num,
+                    "position": {
+                        "bbTop": top,
+                        "bbBot": top + 10,
+                        "bbLeft": (t % 4) * 50,
+                        "bbRight": (t % 4) * 50 + 40,
+                    },
+                }
+            )
+            offset += length + 1
+        pages.append({"tokens": tokens})
+
+    predictions = []
+    for label in DOC_KEY_FIELDS:
+        start = rng.randint(0, offset - 5)
+        predictions.append(
+            {
+                "start": start,
+                "end": start + 3,
+                "label": label,
+                "text": f"{label}-{submission_id}",
+                "confidence": {label: rng.random()},
+            }
+        )
+    for k in range(rng.randint(1, 12)):
+        label = rng.choice(ROW_FIELDS)
+        start = rng.randint(0, offset - 5)
+        predictions.append(
+            {
+                "start": start,
+                "end": start + 2,
+                "label": label,
+                "text": f"v{k}",
+                "confidence": {label: rng.random()},
+            }
+        )
+    if submission_id in ADDED_VALUE_IDS:
+        predictions.append(
+            {"start": 0, "end": 0, "label": ROW_FIELDS[0], "text": "added", "confidence": {}}
+        )
+
+    page_urls = []
+    for page_num, page in enumerate(pages):
+        platform.storage[f"/storage/page/{submission_id}/{page_num}.json"] = page
+        page_urls.append(
+            {"page_info": f"indico-file:///storage/page/{submission_id}/{page_num}.json"}
+        )
+    platform.storage[f"/storage/etl/{submission_id}.json"] = {"pages": page_urls}
+    platform.storage[f"/storage/{submission_id}.json"] = {
+        "etl_output": f"indico-file:///storage/etl/{submission_id}.json",
+        "reviewer_id": submission_id % 3,
+        "results": {
+            "document": {
+                "results": {MODEL_NAME: {"pre_review": predictions, "final": predictions}}
+            }
+        },
+    }
+
+
+def make_platform():
+    platform = FakePlatform(
+        {"COMPLETE": COMPLETE_IDS, "PENDING_ADMIN_REVIEW": EXCEPTION_IDS}
+    )
+    for submission_id in COMPLETE_IDS:
+        add_document(platform, submission_id)
+    for submission_id in EXCEPTION_IDS:
+        platform.storage[f"/storage/{submission_id}.json"] = {
+            "reviewer_id": submission_id * 10
+        }
+    return platform
+
+
+def make_wrapper(platform, directory):
+    api_token_path = os.path.join(directory, "indico_api_token.txt")
+    with open(api_token_path, "w") as f:
+        f.write("token")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(indico_wrapper_module, "IndicoClient", platform.client)
+        return IndicoWrapper("indico.local", api_token_path)
+
+
+@pytest.fixture
+def platform():
+    return make_platform()
+
+
+@pytest.fixture
+def indico_wrapper(platform, tmp_path):
+    return make_wrapper(platform, str(tmp_path))
+
+
+@pytest.fixture(scope="module")
+def reference(tmp_path_factory):
+    """
+    The export and exception files of a run that was never interrupted
+    """
+    directory = tmp_path_factory.mktemp("reference")
+    config = export_config(directory)
+    generate_export.run_export(config, make_wrapper(make_platform(), str(directory)))
+    return read_files(config)
+
+
+def export_config(tmp_path, **overrides):
+    config = {
+        "HOST": "indico.local",
+        "API_TOKEN_PATH": str(tmp_path / "indico_api_token.txt"),
+        "WORKFLOW_ID": 1,
+        "MODEL_NAME": MODEL_NAME,
+        "UPLOAD_BATCH_SIZE": 5,
+        "DOCUMENT_INPUT_DIR": str(tmp_path / "input"),
+        "UPLOADED_DIR": str(tmp_path / "uploaded"),
+        "TIMEOUT": 10,
+        "WAIT": True,
+        "POST_PROCESSING": False,
+        "RETRIEVED": False,
+        "EXPORT_BATCH_SIZE": 2,
+        "DOC_KEY_FIELDS": DOC_KEY_FIELDS,
+        "PAGE_KEY_FIELDS": None,
+        "ROW_FIELDS": ROW_FIELDS,
+        "EXPORT_DIR": str(tmp_path),
+        "STP": False,
+        "FIELD_CONFIG_FILE": None,
+        "DEBUG": False,
+        "EXPORT_FILENAME": "export.csv",
+        "EXCEPTION_FILENAME": "exceptions.csv",
+        "SUBMISSIONS_CSV": None,
+        "LOG_FILE_DIR": str(tmp_path),
+        "LOG_FILENAME": "run",
+        "FETCH_CONCURRENCY": 2,
+        "SUBMISSION_CURSOR_FILE": str(tmp_path / "cursor.json"),
+    }
+    config.update(overrides)
+    return ExportConfiguration(config)
+
+
+def read_files(config):
+    """
+    The export rows with predictions and the exception file. Whether an
+    exception also gets an export row without predictions depends on the
+    other submissions of its batch, so those rows are left out
+    """
+    export_df, exceptions_df = read_export(config)
+    label_columns = export_df.columns[3:]
+    export_df = export_df.dropna(subset=label_columns, how="all")
+    return export_df.to_csv(index=False), exceptions_df.to_csv(index=False)
+
+
+def checkpoint(config):
+    return SubmissionLedger(
+        generate_export.checkpoint_filepath(config.export_dir, config.export_filename)
+    )
+
+
+def read_export(config):
+    export_df = pd.read_csv(os.path.join(config.export_dir, config.export_filename))
+    exceptions_df = pd.read_csv(
+        os.path.join(config.export_dir, config.exception_filename)
+    )
+    return export_df, exceptions_df
+
+
+def test_export(reference):
+    export_df, exceptions_df = [pd.read_csv(io.StringIO(content)) for content in reference]
+    exported_ids = [sub_id for sub_id in COMPLETE_IDS if sub_id not in ADDED_VALUE_IDS]
+    assert export_df["Submission ID"].unique().tolist() == exported_ids
+    assert exceptions_df["Submission ID"].tolist() == ADDED_VALUE_IDS + EXCEPTION_IDS
+
+
+def test_a_crashed_fetch_resumes_to_the_same_export(
+    platform, indico_wrapper, tmp_path, reference
+):
+    config = export_config(tmp_path)
+    platform.result_errors[6] = RuntimeError("worker killed")
+    with pytest.raises(RuntimeError):
+        generate_export.run_export(config, indico_wrapper)
+    ledger = checkpoint(config)
+    assert [sub_id for sub_id in COMPLETE_IDS if ledger.has(sub_id, EXPORTED)] == [1, 2, 3, 4]
+    # the submissions of finished batches are retrieved, the rest are not
+    assert [sub_id for sub_id in COMPLETE_IDS if platform.submissions[sub_id]["retrieved"]] == [1, 2, 3, 4]
+
+    del platform.result_errors[6]
+    generate_export.run_export(config, indico_wrapper)
+    assert read_files(config) == reference
+    assert not os.path.exists(ledger.filepath)
+    assert all(platform.submissions[sub_id]["retrieved"] for sub_id in platform.submissions)
+
+
+@pytest.mark.parametrize("crash_at_write", [1, 2])
+@pytest.mark.parametrize("written", [True, False])
+def test_a_crash_while_writing_a_batch_resumes_to_the_same_export(
+    platform, indico_wrapper, tmp_path, reference, monkeypatch, crash_at_write, written
+):
+    config = export_config(tmp_path)
+    write_batch = ExportWriter.write_batch
+    writes = []
+
+    def crashing_write_batch(self, batch_df):
+        # the batch is recorded as exporting, and maybe in the file, but its
+        # completion is never recorded
+        writes.append(len(batch_df))
+        if len(writes) == crash_at_write and not written:
+            raise RuntimeError("killed before the write")
+        write_batch(self, batch_df)
+        if len(writes) == crash_at_write:
+            raise RuntimeError("killed after the write")
+
+    monkeypatch.setattr(ExportWriter, "write_batch", crashing_write_batch)
+    with pytest.raises(RuntimeError):
+        generate_export.run_export(config, indico_wrapper)
+    monkeypatch.setattr(ExportWriter, "write_batch", write_batch)
+
+    generate_export.run_export(config, indico_wrapper)
+    assert read_files(config) == reference
+
+
+def test_a_failed_mark_retrieved_resumes_to_the_same_export(
+    platform, indico_wrapper, tmp_path, reference, monkeypatch
+):
+    config = export_config(tmp_path)
+    mark_retrieved_many = IndicoWrapper.mark_retrieved_many
+
+    def failing_mark_retrieved_many(self, submission_ids, **kwargs):
+        failures = mark_retrieved_many(self, [i for i in submission_ids if i != 5], **kwargs)
+        if 5 in submission_ids:
+            failures[5] = ConnectionError("connection reset")
+        return failures
+
+    monkeypatch.setattr(IndicoWrapper, "mark_retrieved_many", failing_mark_retrieved_many)
+    with pytest.raises(ConnectionError):
+        generate_export.run_export(config, indico_wrapper)
+    assert not platform.submissions[5]["retrieved"]
+    monkeypatch.setattr(IndicoWrapper, "mark_retrieved_many", mark_retrieved_many)
+
+    generate_export.run_export(config, indico_wrapper)
+    assert read_files(config) == reference
+    assert platform.submissions[5]["retrieved"]
+
+
+def test_the_cursor_only_lists_submissions_updated_since_the_last_run(
+    platform, indico_wrapper, tmp_path
+):
+    # DEBUG leaves submissions unretrieved, so only the cursor keeps the
+    # second run from exporting them again
+    config = export_config(tmp_path, DEBUG=True)
+    first = generate_export.run_export(config, indico_wrapper)
+    assert first["submissions"] == len(COMPLETE_IDS)
+    second = generate_export.run_export(config, indico_wrapper)
+    assert second == {"submissions": 0, "rows": 0, "exceptions": 0}
+
+    platform.touch(7)
+    third = generate_export.run_export(config, indico_wrapper)
+    assert third["submissions"] == 1
+    export_df, _ = read_export(config)
+    assert export_df["Submission ID"].unique().tolist() == [7]
+
+
+def test_an_open_circuit_stops_the_run_so_it_can_resume(
+    platform, indico_wrapper, tmp_path, reference
+):
+    config = export_config(tmp_path)
+    platform.result_errors[4] = CircuitOpenError("circuit open for indico.local")
+    with pytest.raises(CircuitOpenError):
+        generate_export.run_export(config, indico_wrapper)
+
+    # the first batch was handled: the cursor is saved past it and the
+    # checkpoint keeps it for the next run
+    cursor = SubmissionCursor(config.submission_cursor_file)
+    assert cursor.since(config.workflow_id, "COMPLETE") is not None
+    ledger = checkpoint(config)
+    assert [sub_id for sub_id in COMPLETE_IDS if ledger.has(sub_id, EXPORTED)] == [1, 2]
+    assert not platform.submissions[3]["retrieved"]
+
+    del platform.result_errors[4]
+    generate_export.run_export(config, indico_wrapper)
+    assert read_files(config) == reference
+    assert all(platform.submissions[sub_id]["retrieved"] for sub_id in platform.submissions)
@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+import ingest_daemon
+import workflow_upload
+from test_workflow_upload import FakeUploadWrapper, drop_files, upload_config
+
+
+class FailingUploadWrapper(FakeUploadWrapper):
+    """
+    Fails every upload before a submission is created
+    """
+
+    def upload_to_workflow(self, workflow_id, pdf_filepaths):
+        raise ConnectionError("platform unreachable")
+
+
+def make_daemon(tmp_path, wrapper_class, monkeypatch, **kwargs):
+    monkeypatch.setattr(workflow_upload, "IndicoWrapper", wrapper_class)
+    uploader = workflow_upload.WorkflowUpload(upload_config(tmp_path))
+    return ingest_daemon.IngestDaemon(
+        uploader,
+        watcher=None,
+        batch_size=2,
+        batch_delay=60,
+        wait=True,
+        metrics=ingest_daemon.IngestMetrics(),
+        failed_dir=str(tmp_path / "failed"),
+        **kwargs,
+    )
+
+
+def test_submitted_files_are_not_retried_when_the_wait_fails(tmp_path, monkeypatch):
+    daemon = make_daemon(tmp_path, FakeUploadWrapper, monkeypatch)
+    daemon.workflow_upload.indico_wrapper.timeout = True
+    daemon.enqueue(drop_files(str(tmp_path / "input"), {"a.pdf": b"a", "b.pdf": b"b"}))
+    daemon.upload_batch()
+
+    assert daemon.workflow_upload.indico_wrapper.uploads == [["a.pdf", "b.pdf"]]
+    assert not daemon.queue and not daemon.retrying and not daemon.queued
+    assert daemon.metrics.files_uploaded == 2
+    assert daemon.metrics.upload_failures == 0
+
+
+def test_failed_files_are_retried_later_then_moved_to_failed(tmp_path, monkeypatch):
+    daemon = make_daemon(tmp_path, FailingUploadWrapper, monkeypatch, max_attempts=2)
+    input_dir = str(tmp_path / "input")
+    daemon.enqueue(drop_files(input_dir, {"a.pdf": b"a"}))
+    daemon.upload_batch()
+
+    # the failed file waits for its retry time without holding up the queue
+    assert not daemon.queue
+    assert [filepath for _, filepath, _ in daemon.retrying] == [
+        os.path.join(input_dir, "a.pdf")
+    ]
+    assert daemon.metrics.queue_depth == 1
+    daemon.requeue_due()
+    assert not daemon.queue
+    assert 0 < daemon._poll_timeout() <= ingest_daemon.RETRY_DELAY
+
+    retry_at, filepath, seen_at = daemon.retrying[0]
+    daemon.retrying = [(retry_at - ingest_daemon.RETRY_DELAY, filepath, seen_at)]
+    daemon.enqueue(drop_files(input_dir, {"b.pdf": b"b"}))
+    daemon.requeue_due()
+    # retries go back in front of the files seen since
+    assert [os.path.basename(path) for path, _ in daemon.queue] == ["a.pdf", "b.pdf"]
+
+    daemon.upload_batch()
+    assert os.listdir(tmp_path / "failed") == ["a.pdf"]
+    assert daemon.metrics.files_failed == 1
+    assert [os.path.basename(path) for _, path, _ in daemon.retrying] == ["b.pdf"]
+
+
+@pytest.mark.parametrize("remove", [True, False])
+def test_removed_files_are_dropped(tmp_path, monkeypatch, remove):
+    daemon = make_daemon(tmp_path, FailingUploadWrapper, monkeypatch)
+    (filepath,) = drop_files(str(tmp_path / "input"), {"a.pdf": b"a"})
+    daemon.enqueue([filepath])
+    if remove:
+        os.remove(filepath)
+    daemon.upload_batch()
+    assert bool(daemon.retrying) is not remove
+    assert (filepath in daemon.queued) is not remove
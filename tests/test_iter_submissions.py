@@ -0,0 +1,83 @@
+import pytest
+from indico.queries import ListSubmissions, SubmissionFilter
+
+import solutions_toolkit.indico_wrapper.indico_wrapper as indico_wrapper_module
+from solutions_toolkit.indico_wrapper import IndicoWrapper, SubmissionCursor
+from fake_platform import FakePlatform
+
+WORKFLOW_ID = 1
+
+
+@pytest.fixture
+def platform(monkeypatch):
+    platform = FakePlatform({"COMPLETE": range(1, 11), "FAILED": [11]})
+    monkeypatch.setattr(indico_wrapper_module, "IndicoClient", platform.client)
+    return platform
+
+
+@pytest.fixture
+def indico_wrapper(platform, tmp_path):
+    api_token_path = tmp_path / "indico_api_token.txt"
+    api_token_path.write_text("token")
+    return IndicoWrapper("indico.local", str(api_token_path))
+
+
+def test_the_fake_platform_shifts_pages_under_a_mutating_walk(platform, indico_wrapper):
+    request = ListSubmissions(
+        workflow_ids=[WORKFLOW_ID],
+        filters=SubmissionFilter(status="COMPLETE", retrieved=False),
+        limit=3,
+        order_by="UPDATED_AT",
+        desc=False,
+    )
+    seen = []
+    while request.has_next_page:
+        for submission in indico_wrapper.call(request):
+            seen.append(submission.id)
+            indico_wrapper.mark_retreived(submission)
+    assert seen != list(range(1, 11))
+
+
+def test_a_run_mutating_between_pages_sees_every_submission(platform, indico_wrapper):
+    seen = []
+    for submission in indico_wrapper.iter_submissions(
+        WORKFLOW_ID, "COMPLETE", retrieved_flag=False, page_size=3
+    ):
+        seen.append(submission.id)
+        indico_wrapper.mark_retreived(submission)
+    assert seen == list(range(1, 11))
+
+
+def test_submissions_that_stop_matching_are_left_out(platform, indico_wrapper):
+    submissions = indico_wrapper.iter_submissions(
+        WORKFLOW_ID, "COMPLETE", retrieved_flag=False, page_size=3
+    )
+    first = next(submissions)
+    # retrieved by someone else after the listing was walked
+    platform.touch(5, retrieved=True)
+    assert [first.id] + [submission.id for submission in submissions] == [
+        1, 2, 3, 4, 6, 7, 8, 9, 10
+    ]
+
+
+def test_cursor_lists_only_updated_submissions(platform, indico_wrapper, tmp_path):
+    cursor_file = str(tmp_path / "cursor.json")
+    cursor = SubmissionCursor(cursor_file)
+    for submission in indico_wrapper.iter_submissions(
+        WORKFLOW_ID, "COMPLETE", cursor=cursor, page_size=4
+    ):
+        cursor.advance(WORKFLOW_ID, "COMPLETE", submission)
+    cursor.save()
+
+    platform.touch(3)
+    cursor = SubmissionCursor(cursor_file)
+    listed = indico_wrapper.iter_submissions(
+        WORKFLOW_ID, "COMPLETE", cursor=cursor, page_size=4
+    )
+    assert [submission.id for submission in listed] == [3]
+
+
+def test_submissions_by_ids_logs_missing_ids(platform, indico_wrapper, caplog):
+    submissions = indico_wrapper.get_submissions_by_ids([3, 42, "1", 43], page_size=2)
+    assert [submission.id for submission in submissions] == [3, 1]
+    assert "2 submissions were not found: [42, 43]" in caplog.text
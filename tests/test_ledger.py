@@ -0,0 +1,45 @@
+from solutions_toolkit.uipath_block_scripts.ledger import (
+    SubmissionLedger,
+    EXCEPTION,
+    EXPORTED,
+    EXPORTING,
+)
+
+
+def test_entries_survive_a_restart(tmp_path):
+    filepath = str(tmp_path / "checkpoint.jsonl")
+    ledger = SubmissionLedger(filepath)
+    ledger.record_many([1, "2"], EXPORTING, offset=120)
+    ledger.record(1, EXPORTED)
+    ledger.record(3, EXCEPTION, filename="c.pdf", reviewer_id=None)
+
+    ledger = SubmissionLedger(filepath)
+    assert len(ledger) == 3
+    assert ledger.has("1", EXPORTED) and not ledger.has(2, EXPORTED)
+    assert [entry["submission_id"] for entry in ledger.entries(EXPORTING)] == [1, 2]
+    assert ledger.entries(EXPORTING)[0]["offset"] == 120
+    assert ledger.entries(EXCEPTION) == [
+        {"submission_id": 3, "status": EXCEPTION, "filename": "c.pdf", "reviewer_id": None}
+    ]
+
+
+def test_a_partly_written_last_line_is_ignored(tmp_path):
+    filepath = tmp_path / "checkpoint.jsonl"
+    SubmissionLedger(str(filepath)).record(1, EXPORTED)
+    with open(filepath, "a") as f:
+        f.write('{"submission_id": 2, "sta')
+
+    ledger = SubmissionLedger(str(filepath))
+    assert ledger.has(1, EXPORTED) and len(ledger) == 1
+    # later entries start on a line of their own
+    ledger.record(2, EXPORTED)
+    assert SubmissionLedger(str(filepath)).has(2, EXPORTED)
+
+
+def test_clear_removes_the_file(tmp_path):
+    filepath = tmp_path / "checkpoint.jsonl"
+    ledger = SubmissionLedger(str(filepath))
+    ledger.record(1, EXPORTED)
+    ledger.clear()
+    assert not filepath.exists()
+    assert len(ledger) == 0
@@ -0,0 +1,46 @@
+import datetime
+from types import SimpleNamespace
+
+from solutions_toolkit.indico_wrapper import SubmissionCursor
+
+START = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def submission(submission_id, minutes):
+    return SimpleNamespace(
+        id=submission_id, updated_at=START + datetime.timedelta(minutes=minutes)
+    )
+
+
+def test_nothing_seen_lists_everything(tmp_path):
+    cursor = SubmissionCursor(str(tmp_path / "cursor.json"))
+    assert cursor.since(1, "COMPLETE") is None
+    assert cursor.is_new(1, "COMPLETE", submission(1, 0))
+
+
+def test_advance_and_save(tmp_path):
+    filepath = str(tmp_path / "cursor.json")
+    cursor = SubmissionCursor(filepath, overlap_seconds=600)
+    cursor.advance(1, "COMPLETE", submission(1, 0))
+    cursor.advance(1, "COMPLETE", submission(2, 30))
+    # an older submission handled later does not move the mark back
+    cursor.advance(1, "COMPLETE", submission(3, 25))
+    cursor.save()
+
+    cursor = SubmissionCursor(filepath, overlap_seconds=600)
+    assert cursor.since(1, "COMPLETE") == START + datetime.timedelta(minutes=20)
+    assert cursor.since(1, "PENDING_ADMIN_REVIEW") is None
+    assert not cursor.is_new(1, "COMPLETE", submission(2, 30))
+    assert not cursor.is_new(1, "COMPLETE", submission(3, 25))
+    # updated again since it was handled
+    assert cursor.is_new(1, "COMPLETE", submission(2, 31))
+    # only ids inside the overlap window are kept
+    assert set(cursor.marks["1:COMPLETE"]["seen"]) == {"2", "3"}
+
+
+def test_without_a_file_the_cursor_is_not_saved(tmp_path):
+    cursor = SubmissionCursor()
+    cursor.advance(1, "COMPLETE", submission(1, 0))
+    cursor.save()
+    assert cursor.since(1, "COMPLETE") is not None
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,126 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+from indico.errors import IndicoTimeoutError
+
+import workflow_upload
+from solutions_toolkit.uipath_block_scripts.upload_ledger import UploadLedger
+
+
+class FakeUploadWrapper:
+    """
+    Stands in for IndicoWrapper, numbering submissions from 1 and timing out
+    every wait when timeout is set
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.uploads = []
+        self.timeout = False
+
+    def upload_to_workflow(self, workflow_id, pdf_filepaths):
+        first_id = sum(len(batch) for batch in self.uploads) + 1
+        self.uploads.append([os.path.basename(path) for path in pdf_filepaths])
+        return list(range(first_id, first_id + len(pdf_filepaths)))
+
+    def wait_for_submission(self, submission_ids, timeout=60):
+        if self.timeout:
+            raise IndicoTimeoutError(timeout)
+
+
+def upload_config(tmp_path, **overrides):
+    config = dict(
+        host="indico.local",
+        api_token_path=None,
+        rate_limit_per_second=None,
+        upload_batch_size=2,
+        workflow_id=1,
+        uploaded_dir=str(tmp_path / "uploaded"),
+        timeout=10,
+        upload_pipeline_depth=1,
+        upload_workers=1,
+        adaptive_batch_seconds=None,
+        upload_rate_file=None,
+        upload_ledger_db=str(tmp_path / "uploads.db"),
+    )
+    config.update(overrides)
+    os.makedirs(config["uploaded_dir"], exist_ok=True)
+    return SimpleNamespace(**config)
+
+
+def drop_files(directory, contents):
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for filename, content in contents.items():
+        path = os.path.join(directory, filename)
+        with open(path, "wb") as f:
+            f.write(content)
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture
+def fake_wrapper(monkeypatch):
+    monkeypatch.setattr(workflow_upload, "IndicoWrapper", FakeUploadWrapper)
+
+
+def test_upload_ledger_round_trip(tmp_path):
+    ledger = UploadLedger(str(tmp_path / "uploads.db"))
+    ledger.record_uploads([("a" * 64, 7, "a.pdf"), ("b" * 64, "8", "b.pdf")])
+    assert ledger.submission_ids(["a" * 64, "b" * 64, "c" * 64]) == {
+        "a" * 64: 7,
+        "b" * 64: 8,
+    }
+    ledger.close()
+    # the ledger outlives the process
+    assert UploadLedger(str(tmp_path / "uploads.db")).submission_ids(["a" * 64]) == {
+        "a" * 64: 7
+    }
+
+
+def test_duplicates_are_linked_not_uploaded(tmp_path, fake_wrapper):
+    input_dir = str(tmp_path / "input")
+    uploader = workflow_upload.WorkflowUpload(upload_config(tmp_path))
+    uploader.upload_to_workflow(
+        drop_files(input_dir, {"a.pdf": b"a", "copy_of_a.pdf": b"a", "b.pdf": b"b"})
+    )
+    assert uploader.indico_wrapper.uploads == [["a.pdf", "b.pdf"]]
+    assert uploader.duplicate_files == 1
+
+    # a later run with the same content under a new name uploads nothing
+    rerun = workflow_upload.WorkflowUpload(upload_config(tmp_path))
+    rerun.upload_to_workflow(drop_files(input_dir, {"renamed_b.pdf": b"b"}))
+    assert rerun.indico_wrapper.uploads == []
+    assert os.listdir(input_dir) == []
+
+
+@pytest.mark.parametrize("workers, pipeline_depth", [(1, 1), (2, 1)])
+def test_submitted_files_are_recorded_when_the_wait_fails(
+    tmp_path, fake_wrapper, workers, pipeline_depth
+):
+    input_dir = str(tmp_path / "input")
+    config = upload_config(
+        tmp_path, upload_workers=workers, upload_pipeline_depth=pipeline_depth
+    )
+    uploader = workflow_upload.WorkflowUpload(config)
+    uploader.indico_wrapper.timeout = True
+    try:
+        uploader.upload_to_workflow(
+            drop_files(input_dir, {"a.pdf": b"a", "b.pdf": b"b"}), wait=True
+        )
+    except IndicoTimeoutError:
+        pass
+
+    # submitted files are recorded and moved even though the wait failed
+    assert uploader.failed_files == []
+    if workers > 1:
+        assert sorted(uploader.wait_failed_ids) == [1, 2]
+    assert os.listdir(input_dir) == []
+    assert sorted(os.listdir(config.uploaded_dir)) == ["a.pdf", "b.pdf"]
+    ledger = UploadLedger(config.upload_ledger_db)
+    assert len(ledger.submission_ids(uploader.file_hashes.values())) == 2
+
+    # so dropping them again does not upload them a second time
+    rerun = workflow_upload.WorkflowUpload(config)
+    rerun.upload_to_workflow(drop_files(input_dir, {"a.pdf": b"a", "b.pdf": b"b"}))
+    assert rerun.indico_wrapper.uploads == []